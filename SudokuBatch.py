@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""Solves every puzzle found under a set of directories or glob patterns and
+streams one JSON record per puzzle, e.g.
+
+    python SudokuBatch.py --mrv --naked-singles "input_puzzles/more/*"
+
+With --processes the puzzles are spread over a pool of worker processes.
+"""
+import sys, os, glob, json, time, argparse, signal, multiprocessing
+
+from SudokuStarter import init_board, solve, SearchStats
+
+#command line switches and the solve() argument each one turns on
+SOLVE_FLAGS = [
+    ('--forward-checking', 'forward_checking'),
+    ('--mrv', 'MRV'),
+    ('--degree', 'Degree'),
+    ('--lcv', 'LCV'),
+    ('--bitmask', 'bitmask'),
+    ('--naked-singles', 'naked_singles'),
+    ('--hidden-singles', 'hidden_singles'),
+    ('--ac3', 'AC3'),
+    ('--dancing-links', 'dancing_links'),
+    ('--backjumping', 'backjumping'),
+    ('--nogoods', 'nogoods'),
+]
+
+def find_puzzles(patterns):
+    """Generates the paths of the .sudoku files in the given directories or
+    matched by the given glob patterns, walking matched directories"""
+    for pattern in patterns:
+        if not glob.has_magic(pattern) and not os.path.isdir(pattern):
+            #a plain file name is kept so a missing file gets an error record
+            yield pattern
+            continue
+        for path in sorted(glob.glob(pattern)):
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        if name.endswith('.sudoku'):
+                            yield os.path.join(root, name)
+            else:
+                yield path
+
+def solve_puzzle(path, options, verbose = False, timeout = None):
+    """Parses and solves one puzzle file with the given solve() options and
+    returns its result record. A puzzle still searching after timeout seconds
+    is abandoned with a timeout record"""
+    record = {'path': path}
+    try:
+        board = init_board(path)
+    except (IOError, ValueError, IndexError) as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+        return record
+    return solve_board(board, options, verbose, timeout, record)
+
+def solve_board(board, options, verbose = False, timeout = None, record = None):
+    """Solves a parsed board like solve_puzzle and fills in its result record,
+    a new dict unless one is given"""
+    if record is None:
+        record = {}
+    stats = SearchStats()
+    start_time = time.time()
+    solve(board, stats = stats, verbose = verbose, time_limit = timeout or None, **options)
+    record['elapsed'] = time.time() - start_time
+    record['nodes'] = stats.nodes
+    #solved, unsolved, or timeout/budget/cancelled when the search gave up
+    record['status'] = stats.status
+    if stats.solved == True:
+        record['solution'] = board.CurrentGameBoard
+    else:
+        record['solution'] = None
+    return record
+
+def solve_batch(patterns, options, verbose = False, timeout = None):
+    """Generates a result record for every puzzle matched by patterns. Each
+    file is only read when its turn comes"""
+    for path in find_puzzles(patterns):
+        yield solve_puzzle(path, options, verbose, timeout)
+
+def init_worker():
+    """Leaves interrupts to the parent process so ^C stops the whole pool"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def solve_task(task):
+    """Pool entry point for one (path, options, timeout) task"""
+    return solve_puzzle(task[0], task[1], False, task[2])
+
+def solve_parallel(patterns, options, processes = None, chunksize = 1,
+    ordered = True, timeout = None):
+    """Generates a result record for every puzzle matched by patterns, solving
+    them on a pool of processes (one per core by default). Tasks are handed out
+    chunksize at a time. The records come back in puzzle order, or as soon as
+    they are ready when ordered is False. timeout bounds each puzzle on its
+    own so one hard board only holds up its worker"""
+    pool = multiprocessing.Pool(processes, init_worker)
+    tasks = ((path, options, timeout) for path in find_puzzles(patterns))
+    if ordered == True:
+        results = pool.imap(solve_task, tasks, chunksize)
+    else:
+        results = pool.imap_unordered(solve_task, tasks, chunksize)
+
+    finished = False
+    try:
+        for record in results:
+            yield record
+        finished = True
+    finally:
+        #a consumer that stops early should not wait for the remaining puzzles
+        if finished == True:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+def write_records(records, out):
+    """Writes the records as JSON Lines, flushing after each one"""
+    for record in records:
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+
+def parse_args(argv):
+    """Parses the command line shared by the batch tools"""
+    parser = argparse.ArgumentParser(description = 'Solve sudoku puzzles in bulk.')
+    parser.add_argument('patterns', nargs = '+',
+        help = 'directories or glob patterns of .sudoku files')
+    for flag, name in SOLVE_FLAGS:
+        parser.add_argument(flag, dest = name, action = 'store_true')
+    parser.add_argument('-o', '--output', default = '-',
+        help = 'file receiving the JSON Lines records (default: stdout)')
+    parser.add_argument('--print', dest = 'verbose', action = 'store_true',
+        help = 'print the time and board of every solve to stdout')
+    parser.add_argument('-j', '--processes', type = int, default = 1,
+        help = 'number of worker processes, 0 for one per core (default: 1)')
+    parser.add_argument('--chunksize', type = int, default = 1,
+        help = 'puzzles handed to a worker at a time (default: 1)')
+    parser.add_argument('--unordered', action = 'store_true',
+        help = 'write records as soon as they are ready')
+    parser.add_argument('--timeout', type = float, default = None,
+        help = 'seconds allowed per puzzle before it is abandoned')
+    parser.add_argument('--node-limit', type = int, default = None,
+        help = 'search nodes allowed per puzzle before it is abandoned')
+    return parser.parse_args(argv)
+
+def solve_options(args):
+    """Returns the solve() keyword arguments selected on the command line"""
+    options = dict((name, getattr(args, name)) for flag, name in SOLVE_FLAGS)
+    if args.node_limit is not None:
+        options['node_limit'] = args.node_limit
+    return options
+
+def main(argv = None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        if args.processes == 1:
+            records = solve_batch(args.patterns, solve_options(args), args.verbose,
+                args.timeout)
+        else:
+            records = solve_parallel(args.patterns, solve_options(args),
+                args.processes or None, args.chunksize, not args.unordered, args.timeout)
+        write_records(records, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
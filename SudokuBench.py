@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""Benchmarks every combination of the solve() heuristics, plus the newer
+engines, over the bundled puzzles and reports latency, node counts and solve
+rate per suite, e.g.
+
+    python SudokuBench.py --repeat 3 --save bench.json
+    python SudokuBench.py --repeat 3 --baseline bench.json
+
+With --baseline the run fails when a configuration got slower or solves fewer
+puzzles than in the saved results."""
+import sys, json, argparse
+
+from SudokuStarter import percentile, median
+from SudokuBatch import find_puzzles, solve_puzzle
+
+SUITES = [
+    ('easy', 'input_puzzles/easy'),
+    ('9x9', 'input_puzzles/more/9x9'),
+    ('16x16', 'input_puzzles/more/16x16'),
+    ('25x25', 'input_puzzles/more/25x25'),
+]
+
+def heuristic_configs():
+    """Returns (name, solve options) for every forward_checking, MRV, Degree
+    and LCV combination followed by the other engines"""
+    configs = []
+    for forward_checking in (False, True):
+        for MRV in (False, True):
+            for Degree in (False, True):
+                for LCV in (False, True):
+                    options = {'forward_checking': forward_checking, 'MRV': MRV,
+                        'Degree': Degree, 'LCV': LCV}
+                    name = '+'.join(part for part, flag in (('fc', forward_checking),
+                        ('mrv', MRV), ('degree', Degree), ('lcv', LCV)) if flag)
+                    configs.append((name or 'backtrack', options))
+    configs.append(('bitmask+mrv', {'bitmask': True, 'MRV': True}))
+    configs.append(('bitmask+fc+mrv', {'bitmask': True, 'forward_checking': True, 'MRV': True}))
+    configs.append(('singles+mrv', {'naked_singles': True, 'hidden_singles': True, 'MRV': True}))
+    configs.append(('singles+ac3+mrv', {'naked_singles': True, 'hidden_singles': True,
+        'AC3': True, 'MRV': True}))
+    configs.append(('dlx', {'dancing_links': True}))
+    configs.append(('cbj+mrv', {'backjumping': True, 'MRV': True}))
+    configs.append(('cbj+nogoods+mrv', {'nogoods': True, 'MRV': True}))
+    return configs
+
+#statuses of a search that gave up before finishing
+GAVE_UP = ('timeout', 'budget', 'cancelled')
+
+def bench_puzzle(path, options, repeat, warmup, timeout):
+    """Solves one puzzle warmup times without measuring and then repeat times,
+    returning (median seconds, nodes, status). A puzzle that runs out of time
+    or nodes is charged the full timeout and one that fails to load is not
+    timed; neither is run again"""
+    for i in range(warmup):
+        record = solve_puzzle(path, options, timeout = timeout)
+        if record['status'] in GAVE_UP:
+            return timeout, record.get('nodes'), record['status']
+        if record['status'] == 'error':
+            return 0.0, None, 'error'
+    times = []
+    for i in range(repeat):
+        record = solve_puzzle(path, options, timeout = timeout)
+        if record['status'] in GAVE_UP:
+            return timeout, record.get('nodes'), record['status']
+        if record['status'] == 'error':
+            return 0.0, None, 'error'
+        times.append(record['elapsed'])
+    return median(times), record['nodes'], record['status']
+
+def run_benchmark(configs, suites, repeat = 3, warmup = 1, timeout = 10.0, log = None):
+    """Benchmarks every configuration on every suite and returns the results
+    as {config: {suite: summary}}"""
+    results = {}
+    for name, options in configs:
+        results[name] = {}
+        for suite, pattern in suites:
+            times = []
+            nodes = []
+            statuses = {}
+            paths = list(find_puzzles([pattern]))
+            for path in paths:
+                elapsed, count, status = bench_puzzle(path, options, repeat, warmup, timeout)
+                statuses[status] = statuses.get(status, 0) + 1
+                if status != 'error':
+                    times.append(elapsed)
+                if status == 'solved':
+                    nodes.append(count)
+            solved = statuses.get('solved', 0)
+            summary = {
+                'median': median(times) if times else None,
+                'p95': percentile(times, 0.95) if times else None,
+                'nodes': median(nodes) if nodes else None,
+                'solved': solved,
+                'unsolved': statuses.get('unsolved', 0),
+                'gave_up': sum([statuses.get(status, 0) for status in GAVE_UP]),
+                'errors': statuses.get('error', 0),
+                'total': len(paths),
+            }
+            results[name][suite] = summary
+            if log is not None:
+                log.write('%-24s %-6s %d/%d\n' % (name, suite, solved, len(paths)))
+                log.flush()
+    return results
+
+def format_table(results, configs, suites):
+    """Renders the results as a fixed width text table"""
+    lines = ['%-24s %-6s %10s %10s %10s %8s' % ('config', 'suite', 'median ms',
+        'p95 ms', 'nodes', 'solved')]
+    for name, options in configs:
+        for suite, pattern in suites:
+            summary = results[name][suite]
+            if summary['total'] == 0 or summary['median'] is None:
+                continue
+            lines.append('%-24s %-6s %10.2f %10.2f %10s %4d/%-3d' % (name, suite,
+                summary['median']*1000, summary['p95']*1000,
+                summary['nodes'] if summary['nodes'] is not None else '-',
+                summary['solved'], summary['total']))
+    return '\n'.join(lines)
+
+def compare(results, baseline, tolerance = 0.25, min_delta = 0.001):
+    """Returns a description of every configuration and suite that solves
+    fewer puzzles than the baseline or whose median latency grew by more than
+    tolerance (and by at least min_delta seconds)"""
+    regressions = []
+    for name in sorted(results):
+        for suite in sorted(results[name]):
+            if name not in baseline or suite not in baseline[name]:
+                continue
+            now = results[name][suite]
+            then = baseline[name][suite]
+            if now['solved'] < then['solved']:
+                regressions.append('%s %s: solved %d/%d, baseline %d/%d' % (name, suite,
+                    now['solved'], now['total'], then['solved'], then['total']))
+            elif (now['median'] is not None and then['median'] is not None
+                    and now['median'] > then['median'] * (1 + tolerance)
+                    and now['median'] - then['median'] > min_delta):
+                regressions.append('%s %s: median %.2f ms, baseline %.2f ms' % (name, suite,
+                    now['median']*1000, then['median']*1000))
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark the sudoku solvers.')
+    parser.add_argument('--config', action = 'append', dest = 'configs',
+        help = 'only run the named configuration (repeatable)')
+    parser.add_argument('--suite', action = 'append', dest = 'suites',
+        help = 'only run the named suite: ' + ', '.join(s for s, p in SUITES))
+    parser.add_argument('--repeat', type = int, default = 3,
+        help = 'measured runs per puzzle (default: 3)')
+    parser.add_argument('--warmup', type = int, default = 1,
+        help = 'unmeasured runs per puzzle (default: 1)')
+    parser.add_argument('--timeout', type = float, default = 10.0,
+        help = 'seconds allowed per run (default: 10)')
+    parser.add_argument('--save', help = 'write the results to this JSON file')
+    parser.add_argument('--baseline', help = 'compare against results saved with --save')
+    parser.add_argument('--tolerance', type = float, default = 0.25,
+        help = 'allowed relative slowdown against the baseline (default: 0.25)')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    configs = [c for c in heuristic_configs() if not args.configs or c[0] in args.configs]
+    suites = [s for s in SUITES if not args.suites or s[0] in args.suites]
+    results = run_benchmark(configs, suites, args.repeat, args.warmup, args.timeout,
+        sys.stderr)
+    print format_table(results, configs, suites)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'repeat': args.repeat, 'warmup': args.warmup,
+                'timeout': args.timeout, 'results': results}, f, indent = 2, sort_keys = True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print 'REGRESSION ' + line
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
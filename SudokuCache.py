@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+"""Caches solutions under a canonical form of the clue grid, so a puzzle that
+is a transposition, a band/stack or row/column permutation or a relabeling
+of one solved before is answered without searching.
+
+The canonical grid is the lexicographically smallest of the transformed
+grids, with the digits renumbered in order of first appearance. The
+candidate transforms sort the bands and the rows within each band (and the
+stacks and columns) by clue count signatures and try every order of the
+tied ones. When the ties allow too many orders only the sorted one is kept:
+such a puzzle may miss a hit, but a key is always a real transform of its
+puzzle so a hit is always a correct solution.
+"""
+import math, itertools, anydbm
+from collections import OrderedDict
+
+#transformed cells compared per canonical_form call before giving up on ties
+WORK_LIMIT = 200000
+
+class Transform(object):
+    """Maps a board onto its canonical grid and back. Canonical row i and
+    column j come from rows[i] and cols[j] of the board, transposed first
+    when transpose is set, and digit d becomes labels[d]."""
+
+    def __init__(self, size, transpose, rows, cols, labels):
+        self.size = size
+        self.transpose = transpose
+        self.rows = rows
+        self.cols = cols
+        self.labels = labels
+
+    def source(self, i, j):
+        """Returns the board cell behind canonical cell (i, j)"""
+        row = self.rows[i]
+        col = self.cols[j]
+        if self.transpose:
+            return col*self.size + row
+        return row*self.size + col
+
+    def apply(self, cells):
+        """Returns the canonical cells of a board's cells"""
+        size = self.size
+        labels = self.labels
+        return bytearray([labels[cells[self.source(i, j)]]
+            for i in range(size) for j in range(size)])
+
+    def restore(self, canonical):
+        """Returns the board cells of canonical cells, the inverse of apply"""
+        size = self.size
+        inverse = [0]*(size+1)
+        for digit in range(size+1):
+            inverse[self.labels[digit]] = digit
+        cells = bytearray(size*size)
+        for i in range(size):
+            for j in range(size):
+                cells[self.source(i, j)] = inverse[canonical[i*size + j]]
+        return cells
+
+def line_signatures(grid, size):
+    """Returns a signature for every row of grid that a permutation of rows,
+    columns or digits leaves unchanged: its clue count and the sorted clue
+    counts of the columns its clues lie in"""
+    rowcount = [0]*size
+    colcount = [0]*size
+    for row in range(size):
+        for col in range(size):
+            if grid[row*size + col] != 0:
+                rowcount[row] += 1
+                colcount[col] += 1
+    return [(rowcount[row], sorted([colcount[col] for col in range(size)
+        if grid[row*size + col] != 0])) for row in range(size)]
+
+def tied_orders(items, key):
+    """Returns every order of items sorted by key, permuting the tied items"""
+    groups = [list(group) for k, group in itertools.groupby(sorted(items, key = key), key)]
+    return [sum(choice, []) for choice in
+        itertools.product(*[[list(order) for order in itertools.permutations(group)]
+            for group in groups])]
+
+def factorial_ties(items, key):
+    """Returns the number of orders tied_orders would produce"""
+    count = 1
+    for k, group in itertools.groupby(sorted(items, key = key), key):
+        count *= math.factorial(len(list(group)))
+    return count
+
+def line_orders(signature, subsquare, limit):
+    """Returns the candidate orders of the rows of a grid: blocks of subsquare
+    rows sorted by the sorted signatures of their rows, rows sorted within
+    each block. Only the sorted order is returned when more than limit
+    orders tie."""
+    blocks = range(subsquare)
+    members = [range(block*subsquare, (block+1)*subsquare) for block in blocks]
+    blockkey = lambda block: sorted([signature[row] for row in members[block]])
+    rowkey = lambda row: signature[row]
+
+    count = factorial_ties(blocks, blockkey)
+    for block in blocks:
+        count *= factorial_ties(members[block], rowkey)
+    if count > limit:
+        order = sorted(blocks, key = blockkey)
+        return [sum([sorted(members[block], key = rowkey) for block in order], [])]
+
+    within = [tied_orders(members[block], rowkey) for block in blocks]
+    orders = []
+    for order in tied_orders(blocks, blockkey):
+        for rows in itertools.product(*[within[block] for block in order]):
+            orders.append(sum(rows, []))
+    return orders
+
+def canonical_form(board):
+    """Returns the canonical clue grid of a board as a string key and the
+    Transform that maps the board onto it"""
+    size = board.BoardSize
+    subsquare = int(math.sqrt(size))
+    cells = board.cells
+    transposed = bytearray([cells[col*size + row] for row in range(size) for col in range(size)])
+    limit = max(1, WORK_LIMIT // (2*size*size))
+
+    best = None
+    for transpose, grid in ((False, cells), (True, transposed)):
+        rowsig = line_signatures(grid, size)
+        colsig = line_signatures(transposed if not transpose else cells, size)
+        roworders = line_orders(rowsig, subsquare, limit)
+        colorders = line_orders(colsig, subsquare, max(1, limit // len(roworders)))
+        for rows in roworders:
+            for cols in colorders:
+                labels = [0]*(size+1)
+                canonical = bytearray(size*size)
+                following = 1
+                cell = 0
+                for row in rows:
+                    base = row*size
+                    for col in cols:
+                        digit = grid[base + col]
+                        if digit != 0:
+                            if labels[digit] == 0:
+                                labels[digit] = following
+                                following += 1
+                            canonical[cell] = labels[digit]
+                        cell += 1
+                if best is None or canonical < best[0]:
+                    best = (canonical, transpose, rows, cols, labels)
+
+    canonical, transpose, rows, cols, labels = best
+    #digits without a clue take the remaining labels in increasing order
+    following = max(labels) + 1
+    for digit in range(1, size+1):
+        if labels[digit] == 0:
+            labels[digit] = following
+            following += 1
+    return str(canonical), Transform(size, transpose, rows, cols, labels)
+
+class SolutionCache(object):
+    """Least recently used cache of canonical solutions, optionally backed
+    by a dbm file that keeps them across runs"""
+
+    def __init__(self, capacity = 1024, path = None):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.store = anydbm.open(path, 'c') if path is not None else None
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, key):
+        """Returns the canonical solution cells under key or None"""
+        solution = self.entries.pop(key, None)
+        if solution is None and self.store is not None and self.store.has_key(key):
+            solution = self.store[key]
+        if solution is not None:
+            self.remember(key, solution)
+        return solution
+
+    def remember(self, key, solution):
+        """Puts key last in the memory cache, evicting the oldest entry"""
+        self.entries[key] = solution
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last = False)
+
+    def lookup(self, board):
+        """Canonicalizes board and fills it in place when its solution is
+        cached. Returns (key, transform, hit) for a later store."""
+        key, transform = canonical_form(board)
+        solution = self.find(key)
+        if solution is None:
+            self.misses += 1
+            return key, transform, False
+        self.hits += 1
+        board.restore(transform.restore(bytearray(solution)))
+        return key, transform, True
+
+    def store_solution(self, key, transform, board):
+        """Caches the solved board under the key of its puzzle"""
+        solution = str(transform.apply(board.cells))
+        self.remember(key, solution)
+        if self.store is not None:
+            self.store[key] = solution
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Checks filled boards unit by unit. With NumPy a whole stack of boards is
+checked at once: every row, column and square of every board is gathered
+into one array, sorted and compared against 1..size. Without NumPy the same
+checks run board by board over the geometry tables.
+
+    python SudokuCheck.py solved.jsonl
+"""
+import sys, json, math
+
+from SudokuStarter import SudokuBoard, get_geometry
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UNIT_KINDS = ('row', 'col', 'square')
+
+def unit_name(size, unit):
+    """Returns the (kind, number) of a unit index, numbers are zero-indexed"""
+    return UNIT_KINDS[unit // size], unit % size
+
+_UNIT_INDEX = {}
+
+def unit_index(size):
+    """Returns the (3*size, size) array of the cells of every unit"""
+    index = _UNIT_INDEX.get(size)
+    if index is None:
+        index = _UNIT_INDEX[size] = numpy.array(get_geometry(size).units,
+            dtype = numpy.intp)
+    return index
+
+def board_size(board):
+    """Returns the size of a SudokuBoard, a list of rows or a flat board"""
+    if isinstance(board, SudokuBoard):
+        return board.BoardSize
+    if isinstance(board[0], (list, tuple)):
+        return len(board)
+    return int(math.sqrt(len(board)))
+
+def stack_boards(boards, size):
+    """Returns the boards as one (count, size*size) array"""
+    if isinstance(boards, numpy.ndarray):
+        return boards.reshape(len(boards), size*size)
+    if len(boards) > 0 and isinstance(boards[0], SudokuBoard):
+        #the flat cells are already laid out as the rows of the stack
+        data = ''.join([bytes(board.cells) for board in boards])
+        return numpy.frombuffer(data, dtype = numpy.uint8).reshape(len(boards), size*size)
+    return numpy.array(boards).reshape(len(boards), size*size)
+
+def unit_violations(boards, size = None):
+    """Returns a (count, 3*size) boolean array, True where a unit of a board
+    does not hold every value exactly once. boards is a (count, size, size)
+    or (count, size*size) array or a list of boards of one size."""
+    if size is None:
+        if isinstance(boards, numpy.ndarray):
+            size = boards.shape[1] if boards.ndim == 3 else int(math.sqrt(boards.shape[1]))
+        else:
+            size = board_size(boards[0])
+    stack = stack_boards(boards, size)
+    values = stack[:, unit_index(size)]
+    values.sort(axis = 2)
+    return (values != numpy.arange(1, size+1)).any(axis = 2)
+
+def check_boards(boards):
+    """Returns for every board the list of its violated unit indexes, an
+    empty list meaning the board is solved. All boards share one size."""
+    if len(boards) == 0:
+        return []
+    if numpy is not None:
+        return [list(numpy.flatnonzero(row)) for row in unit_violations(boards)]
+
+    size = board_size(boards[0])
+    units = get_geometry(size).units
+    expected = set(range(1, size+1))
+    results = []
+    for board in boards:
+        if isinstance(board, SudokuBoard):
+            cells = board.cells
+        elif isinstance(board[0], (list, tuple)):
+            cells = [value for row in board for value in row]
+        else:
+            cells = board
+        results.append([unit for unit in range(len(units))
+            if set([cells[cell] for cell in units[unit]]) != expected])
+    return results
+
+def valid_boards(boards):
+    """Returns for every board whether it is completely and correctly filled"""
+    return [len(violated) == 0 for violated in check_boards(boards)]
+
+def check_board(board):
+    """Returns the (kind, number) of every violated unit of one board"""
+    size = board_size(board)
+    return [unit_name(size, unit) for unit in check_boards([board])[0]]
+
+def main(argv = None):
+    """Checks the solutions of the JSON Lines records written by SudokuBatch"""
+    argv = sys.argv[1:] if argv is None else argv
+    bad = 0
+    for path in argv:
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        records = [record for record in records if record.get('solution')]
+        sizes = {}
+        for record in records:
+            sizes.setdefault(len(record['solution']), []).append(record)
+        for size, group in sorted(sizes.items()):
+            results = check_boards([record['solution'] for record in group])
+            for record, violated in zip(group, results):
+                if len(violated) > 0:
+                    bad = bad + 1
+                    print record['path'], ' '.join(['%s %d' % (kind, number+1)
+                        for kind, number in [unit_name(size, unit) for unit in violated]])
+    return 1 if bad > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
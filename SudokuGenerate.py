@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""Generates puzzles with a unique solution and grades them by the effort the
+solver needs. A full grid is built by a search from a random first row and
+a few random clues, then clues are removed in random order as long as the
+solution stays unique. Puzzles are written as .sudoku files and one JSON
+record per puzzle is streamed, e.g.
+
+    python SudokuGenerate.py 9 1000 -o generated/9x9 -j 0
+"""
+import sys, os, json, math, random, argparse, multiprocessing
+
+from SudokuStarter import (SudokuBoard, BitmaskState, SearchStats, SearchLimit, solve,
+    solutions, is_unique, popcount, mask_values, format_board)
+from SudokuBatch import init_worker
+
+GRADES = ('easy', 'medium', 'hard', 'expert')
+
+def random_grid(size, rng):
+    """Returns a random completely filled board: a random first row and size
+    random clues that agree with it are completed by a search, which starts
+    over from new clues when it runs past size*size nodes, and the grid is
+    transposed half of the time"""
+    while True:
+        board = SudokuBoard(size, [0]*(size*size))
+        digits = range(1, size+1)
+        rng.shuffle(digits)
+        for col in range(size):
+            board.set_value(0, col, digits[col])
+        state = BitmaskState(board)
+        for i in range(size):
+            row = rng.randrange(1, size)
+            col = rng.randrange(size)
+            values = mask_values(state.candidates(row, col))
+            if board.get_value(row, col) == 0 and len(values) > 0:
+                num = rng.choice(values)
+                board.set_value(row, col, num)
+                state.mark(row, col, num)
+        stats = SearchStats()
+        stats.node_limit = size*size
+        try:
+            if next(solutions(board, naked_singles = True, hidden_singles = True,
+                    MRV = True, stats = stats), None) is not None:
+                break
+        except SearchLimit:
+            pass
+    if rng.random() < 0.5:
+        cells = board.cells
+        board = SudokuBoard(size, [cells[col*size + row] for row in range(size)
+            for col in range(size)])
+    return board
+
+def proven_unique(board, node_limit):
+    """Returns True when the board is shown to have a unique solution within
+    node_limit search nodes"""
+    stats = SearchStats()
+    stats.node_limit = node_limit
+    try:
+        return is_unique(board, stats)
+    except SearchLimit:
+        return False
+
+def remove_clues(board, rng, attempts = None, node_limit = None):
+    """Empties cells of a board with a unique solution in random order, keeping
+    each removal only if the solution stays unique. A removed cell left with a
+    single candidate is forced and needs no search; otherwise a removal whose
+    uniqueness check runs past node_limit nodes (size*size//2 by default) is
+    given up. At most attempts cells are tried when given."""
+    size = board.BoardSize
+    if node_limit is None:
+        node_limit = size*size // 2
+    state = BitmaskState(board)
+    order = range(size*size)
+    rng.shuffle(order)
+    if attempts is not None:
+        order = order[:attempts]
+    for cell in order:
+        row = cell // size
+        col = cell % size
+        num = board.get_value(row, col)
+        board.set_value(row, col, 0)
+        state.unmark(row, col, num)
+        if popcount(state.candidates(row, col)) > 1 and proven_unique(board, node_limit) == False:
+            board.set_value(row, col, num)
+            state.mark(row, col, num)
+    return board
+
+def grade_puzzle(board):
+    """Returns the grade of a puzzle and the search nodes needed for it: easy
+    when naked singles alone solve it, medium when hidden singles are needed,
+    hard when a few guesses are needed and expert beyond that"""
+    stats = SearchStats()
+    solve(board.copy(), naked_singles = True, hidden_singles = True, MRV = True,
+        stats = stats, verbose = False)
+    if stats.nodes > board.BoardSize:
+        return 'expert', stats.nodes
+    if stats.nodes > 0:
+        return 'hard', stats.nodes
+
+    #naked singles alone must get there without a single guess too
+    stats = SearchStats()
+    solve(board.copy(), naked_singles = True, stats = stats, verbose = False, node_limit = 0)
+    if stats.status != 'solved':
+        return 'medium', 0
+    return 'easy', 0
+
+def generate(size, seed = None, attempts = None, node_limit = None):
+    """Returns a new puzzle with a unique solution, its grade and search nodes"""
+    rng = random.Random(seed)
+    board = remove_clues(random_grid(size, rng), rng, attempts, node_limit)
+    grade, nodes = grade_puzzle(board)
+    return board, grade, nodes
+
+def generate_task(task):
+    """Pool entry point for one (size, seed, attempts, node_limit) task,
+    returns the puzzle cells with its grade and nodes"""
+    board, grade, nodes = generate(*task)
+    return bytes(board.cells), grade, nodes
+
+def generate_puzzles(size, count, seed = None, attempts = None, node_limit = None,
+    processes = 1):
+    """Generates count (board, grade, nodes) triples, on a pool of processes
+    unless processes is 1. Puzzle i uses seed+i so a run can be repeated."""
+    if seed is None:
+        seed = random.randrange(1 << 30)
+    tasks = [(size, seed + i, attempts, node_limit) for i in range(count)]
+    if processes == 1:
+        for task in tasks:
+            yield generate(*task)
+        return
+
+    pool = multiprocessing.Pool(processes, init_worker)
+    finished = False
+    try:
+        for cells, grade, nodes in pool.imap(generate_task, tasks):
+            yield SudokuBoard(size, bytearray(cells)), grade, nodes
+        finished = True
+    finally:
+        if finished == True:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Generate graded sudoku puzzles.')
+    parser.add_argument('size', type = int, help = 'board size, a square such as 9, 16 or 25')
+    parser.add_argument('count', type = int, help = 'number of puzzles')
+    parser.add_argument('-o', '--output', default = '.',
+        help = 'directory receiving the .sudoku files (default: .)')
+    parser.add_argument('--seed', type = int, default = None,
+        help = 'seed of the first puzzle, the following ones count up from it')
+    parser.add_argument('--attempts', type = int, default = None,
+        help = 'cells tried for removal per puzzle (default: all)')
+    parser.add_argument('--node-limit', type = int, default = None,
+        help = 'search nodes allowed per uniqueness check (default: size*size/2)')
+    parser.add_argument('-j', '--processes', type = int, default = 1,
+        help = 'number of worker processes, 0 for one per core (default: 1)')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if int(math.sqrt(args.size))**2 != args.size:
+        parser.error('the board size must be a square')
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    puzzles = generate_puzzles(args.size, args.count, args.seed, args.attempts,
+        args.node_limit, args.processes or None)
+    for i, (board, grade, nodes) in enumerate(puzzles):
+        path = os.path.join(args.output, '%dx%d.%d.sudoku' % (args.size, args.size, i+1))
+        with open(path, 'w') as f:
+            f.write(format_board(board))
+        clues = sum([1 for value in board.cells if value != 0])
+        sys.stdout.write(json.dumps({'path': path, 'grade': grade, 'nodes': nodes,
+            'clues': clues}) + '\n')
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
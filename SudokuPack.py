@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""Loads puzzles in bulk and stores them in a compact binary pack. A pack is
+a 16 byte header (magic, board size, puzzle count) followed by one dense
+record of size*size cell bytes per puzzle, 0 for an empty cell. The records
+have a fixed length so a memory-mapped pack reads any puzzle without parsing.
+
+    python SudokuPack.py pack puzzles.pack "input_puzzles/more/9x9"
+    python SudokuPack.py unpack puzzles.pack out_dir
+"""
+import sys, os, mmap, struct, argparse
+
+from SudokuStarter import SudokuBoard, parse_text, format_board
+from SudokuBatch import find_puzzles
+
+MAGIC = 'SDKP'
+HEADER = struct.Struct('<4sHxxQ')
+
+def load_puzzles(patterns):
+    """Generates a (path, SudokuBoard) pair for every .sudoku file in the
+    given directories or glob patterns, reading each file in a single call"""
+    for path in find_puzzles(patterns):
+        with open(path, 'rb') as f:
+            board = parse_text(f.read())
+        yield path, SudokuBoard(len(board), board)
+
+def write_pack(filename, boards):
+    """Writes boards of one size to a pack and returns how many were written.
+    The pack is written under a temporary name and only renamed into place
+    once it is complete, so an error leaves no partial pack behind."""
+    count = 0
+    size = None
+    partial = filename + '.partial'
+    try:
+        with open(partial, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, 0, 0))
+            for board in boards:
+                if size is None:
+                    size = board.BoardSize
+                elif board.BoardSize != size:
+                    raise ValueError('%s: a pack holds boards of one size, got %d and %d'
+                        % (filename, size, board.BoardSize))
+                f.write(board.cells)
+                count = count + 1
+            #the header is written last, once the size and count are known
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, size or 0, count))
+        os.rename(partial, filename)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return count
+
+class PuzzlePack(object):
+    """Read-only view of a pack file. The file is memory-mapped and a board
+    is only copied out of the map when it is indexed."""
+
+    def __init__(self, filename):
+        """Maps the file and checks its header"""
+        self.file = open(filename, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        magic, self.size, self.count = HEADER.unpack(self.map[:HEADER.size])
+        self.area = self.size*self.size
+        if magic != MAGIC or len(self.map) != HEADER.size + self.count*self.area:
+            self.close()
+            raise ValueError('%s is not a puzzle pack' % filename)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        """Returns puzzle i as a new SudokuBoard"""
+        if i < 0:
+            i = i + self.count
+        if i < 0 or i >= self.count:
+            raise IndexError('pack index out of range')
+        start = HEADER.size + i*self.area
+        return SudokuBoard(self.size, bytearray(self.map[start:start + self.area]))
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def unpack(filename, directory):
+    """Writes every puzzle of a pack as a numbered .sudoku file"""
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with PuzzlePack(filename) as pack:
+        for i in range(len(pack)):
+            name = os.path.join(directory, '%dx%d.%d.sudoku' % (pack.size, pack.size, i+1))
+            with open(name, 'w') as f:
+                f.write(format_board(pack[i]))
+    return len(pack)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Convert sudoku puzzles to and from packs.')
+    commands = parser.add_subparsers(dest = 'command')
+    pack_parser = commands.add_parser('pack', help = 'store .sudoku files in a pack')
+    pack_parser.add_argument('pack')
+    pack_parser.add_argument('patterns', nargs = '+',
+        help = 'directories or glob patterns of .sudoku files')
+    unpack_parser = commands.add_parser('unpack', help = 'write a pack back as .sudoku files')
+    unpack_parser.add_argument('pack')
+    unpack_parser.add_argument('directory')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command == 'pack':
+        count = write_pack(args.pack, (board for path, board in load_puzzles(args.patterns)))
+    else:
+        count = unpack(args.pack, args.directory)
+    print count, 'puzzles'
+
+if __name__ == '__main__':
+    main()
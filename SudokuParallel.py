@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""Parallel search over a single hard puzzle. The top levels of the search
+tree are expanded into independent sub-problems which are solved on a pool of
+worker processes, and the first solution found wins. Alternatively a
+portfolio of differently configured searches races on the whole puzzle and
+the first one to answer wins."""
+import sys, time, argparse, multiprocessing
+
+from SudokuStarter import (SudokuBoard, BitmaskState, SearchStats, init_board,
+    solve, solve_restarts, popcount, mask_values)
+from SudokuBatch import SOLVE_FLAGS, init_worker
+
+def split_cell(board, size):
+    """Fills the cells of the 2d array that have a single candidate and returns
+    the remaining empty cell with the fewest candidates as (row, col, mask).
+    Returns None when the board is complete, and a zero mask when some cell
+    is left without candidates"""
+    while True:
+        state = BitmaskState(SudokuBoard(size, board))
+        best = None
+        forced = False
+        for row in range(size):
+            for col in range(size):
+                if board[row][col] == 0:
+                    mask = state.candidates(row, col)
+                    if mask == 0:
+                        return (row, col, 0)
+                    if popcount(mask) == 1:
+                        board[row][col] = mask.bit_length()
+                        state.mark(row, col, board[row][col])
+                        forced = True
+                    elif best is None or popcount(mask) < popcount(best[2]):
+                        best = (row, col, mask)
+        if forced == False:
+            return best
+
+def split_board(initial_board, depth = 1):
+    """Returns the sub-problems of the board as 2d arrays: depth times, the
+    empty cell with the fewest candidates is filled with each of its values.
+    Forced cells are filled along the way and branches where some cell is left
+    without candidates are dropped"""
+    size = initial_board.BoardSize
+    boards = [[row[:] for row in initial_board.CurrentGameBoard]]
+
+    for level in range(depth):
+        children = []
+        for board in boards:
+            target = split_cell(board, size)
+            if target is None:
+                #already complete, nothing left to split
+                children.append(board)
+                continue
+            for num in mask_values(target[2]):
+                child = [line[:] for line in board]
+                child[target[0]][target[1]] = num
+                children.append(child)
+        boards = children
+    return boards
+
+#set in each worker by init_subproblem_worker
+cancel_event = None
+
+def init_subproblem_worker(cancel):
+    """Pool initializer: leaves interrupts to the parent and keeps the event
+    that stops the searches once a solution is found"""
+    global cancel_event
+    init_worker()
+    cancel_event = cancel
+
+def solve_subproblem(task):
+    """Pool entry point: solves one (size, board, options) sub-problem and
+    returns (status, board, nodes)"""
+    size, board, options = task
+    stats = SearchStats()
+    sub_board = SudokuBoard(size, board)
+    solve(sub_board, stats = stats, verbose = False, cancel = cancel_event, **options)
+    return stats.status, sub_board.CurrentGameBoard, stats.nodes
+
+def parallel_solve(initial_board, depth = 1, processes = None, stats = None, **options):
+    """Solves the board by splitting the first depth levels of the search into
+    sub-problems and farming them out to processes workers with the given
+    solve() options. As soon as one finds a solution, which is written on
+    initial_board, the others are cancelled and give up at their next step.
+    Returns the board, and fills stats with the outcome and the nodes of the
+    sub-problems that finished. stats.status is 'solved', 'unsolved' when
+    every sub-problem was searched through, or else why one gave up."""
+    if stats is None:
+        stats = SearchStats()
+    start_time = time.time()
+    size = initial_board.BoardSize
+    tasks = [(size, board, options) for board in split_board(initial_board, depth)]
+
+    cancel = multiprocessing.Event()
+    pool = multiprocessing.Pool(processes, init_subproblem_worker, (cancel,))
+    finished = False
+    status = 'unsolved'
+    try:
+        for sub_status, board, nodes in pool.imap_unordered(solve_subproblem, tasks):
+            stats.nodes += nodes
+            if sub_status == 'solved':
+                for row in range(size):
+                    for col in range(size):
+                        initial_board.set_value(row, col, board[row][col])
+                stats.solved = True
+                status = 'solved'
+                break
+            if sub_status != 'unsolved':
+                #a sub-problem that gave up leaves the outcome open
+                status = sub_status
+        finished = True
+    finally:
+        #the searches still running stop by themselves, an error kills them
+        cancel.set()
+        if finished == True:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+    stats.status = status
+    stats.elapsed = time.time() - start_time
+    return initial_board
+
+#configurations raced by portfolio_solve: a name, the solve() options and the
+#restart_nodes of a randomized Luby restart series, or None for a single run
+PORTFOLIO = [
+    ('fc+mrv', dict(bitmask = True, forward_checking = True, MRV = True), None),
+    ('singles+mrv', dict(naked_singles = True, hidden_singles = True, MRV = True), None),
+    ('cbj+mrv', dict(backjumping = True, MRV = True), None),
+    ('dlx', dict(dancing_links = True), None),
+    ('singles+mrv+luby', dict(naked_singles = True, hidden_singles = True, MRV = True), 100),
+    ('fc+mrv+lcv+luby', dict(bitmask = True, forward_checking = True, MRV = True,
+        LCV = True), 50),
+]
+
+def solve_config(task):
+    """Pool entry point: solves one (size, cells, name, options, restart_nodes,
+    seed, time_limit) task and returns (name, cells, stats as a dict)"""
+    size, cells, name, options, restart_nodes, seed, time_limit = task
+    stats = SearchStats()
+    board = SudokuBoard(size, bytearray(cells))
+    if restart_nodes is None:
+        solve(board, stats = stats, verbose = False, time_limit = time_limit,
+            cancel = cancel_event, **options)
+    else:
+        solve_restarts(board, restart_nodes, seed, stats, time_limit, cancel = cancel_event,
+            **options)
+    return name, bytes(board.cells), stats.as_dict()
+
+def portfolio_solve(initial_board, configs = None, processes = None, seed = None,
+    time_limit = None, stats = None):
+    """Races the configurations (PORTFOLIO by default, see there) on the whole
+    board, one worker process each unless processes says otherwise. The first
+    one to find a solution, or to prove there is none, wins: the others are
+    cancelled, the solution is written on initial_board and stats receives
+    the winner's counters. Restart series get seeds counting up from seed.
+    Returns the name of the winning configuration, None when every one ran
+    out of time."""
+    if configs is None:
+        configs = PORTFOLIO
+    if stats is None:
+        stats = SearchStats()
+    start_time = time.time()
+    size = initial_board.BoardSize
+    tasks = [(size, bytes(initial_board.cells), name, options, restart_nodes,
+        None if seed is None else seed + i, time_limit)
+        for i, (name, options, restart_nodes) in enumerate(configs)]
+
+    winner = None
+    cancel = multiprocessing.Event()
+    pool = multiprocessing.Pool(processes or len(configs), init_subproblem_worker, (cancel,))
+    finished = False
+    try:
+        for name, cells, record in pool.imap_unordered(solve_config, tasks):
+            if record['status'] in ('solved', 'unsolved'):
+                winner = name
+                initial_board.restore(cells)
+                stats.__dict__.update(record)
+                break
+            stats.status = record['status']
+        finished = True
+    finally:
+        cancel.set()
+        if finished == True:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+    stats.elapsed = time.time() - start_time
+    return winner
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Solve one sudoku on several cores.')
+    parser.add_argument('puzzle', help = '.sudoku file to solve')
+    for flag, name in SOLVE_FLAGS:
+        parser.add_argument(flag, dest = name, action = 'store_true')
+    parser.add_argument('--depth', type = int, default = 1,
+        help = 'search levels expanded into sub-problems (default: 1)')
+    parser.add_argument('-j', '--processes', type = int, default = 0,
+        help = 'number of worker processes, 0 for one per core (default: 0)')
+    parser.add_argument('--portfolio', action = 'store_true',
+        help = 'race the PORTFOLIO configurations instead of splitting the search')
+    parser.add_argument('--seed', type = int, default = None,
+        help = 'first seed of the portfolio restart series')
+    parser.add_argument('--timeout', type = float, default = None,
+        help = 'seconds allowed to each portfolio configuration or sub-problem')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    stats = SearchStats()
+    board = init_board(args.puzzle)
+    if args.portfolio == True:
+        #one process per configuration unless -j is given
+        winner = portfolio_solve(board, None, args.processes or None, args.seed,
+            args.timeout, stats)
+        print "The winner: "
+        print winner
+    else:
+        options = dict((name, getattr(args, name)) for flag, name in SOLVE_FLAGS)
+        options['time_limit'] = args.timeout
+        parallel_solve(board, args.depth, args.processes or None, stats, **options)
+    print "The time used: "
+    print stats.elapsed
+    if stats.solved == True:
+        board.print_board()
+    else:
+        print "No solution found"
+
+if __name__ == '__main__':
+    main()
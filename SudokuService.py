@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+"""Serves solve requests over TCP. Every connection gets its own thread that
+reads requests and waits for their results, while the searches run on a
+bounded pool of worker processes. Identical puzzles asked for at the same
+time share one solve, and when too many distinct puzzles are pending new ones
+are turned away with a busy reply instead of queueing without bound.
+
+The protocol is line based. A request is either
+
+    SOLVE [solve flags]
+    <puzzle in the .sudoku text format>
+
+or STATS, and each is answered with one JSON line, e.g.
+
+    python SudokuService.py --port 8765 -j 0 --timeout 10 --mrv --naked-singles
+"""
+import sys, json, math, time, socket, argparse, threading, collections, multiprocessing
+import SocketServer
+
+from SudokuStarter import SudokuBoard, parse_text, consistent_clues, percentile
+from SudokuBatch import SOLVE_FLAGS, init_worker, solve_board
+
+FLAG_NAMES = dict(SOLVE_FLAGS)
+
+#largest board accepted and longest request line read
+MAX_SIZE = 36
+MAX_LINE = 1024
+
+class ServiceBusy(Exception):
+    """Raised when a new puzzle arrives while the pending queue is full"""
+
+class ServiceTimeout(Exception):
+    """Raised when the result of a puzzle does not come back in time"""
+
+def check_header(size, count):
+    """Raises ValueError unless size is a square board size up to MAX_SIZE
+    and count a possible number of clues for it"""
+    if size < 1 or size > MAX_SIZE or int(math.sqrt(size))**2 != size:
+        raise ValueError('board size must be a square up to %d' % MAX_SIZE)
+    if count < 0 or count > size*size:
+        raise ValueError('clue count must be between 0 and %d' % (size*size))
+
+def check_clues(size, count, words):
+    """Raises ValueError unless words hold count clues of a size board, each a
+    row, column and value between 1 and size"""
+    if len(words) != 3*count:
+        raise ValueError('expected %d clues of three numbers' % count)
+    for i in range(0, len(words), 3):
+        row, col, val = [int(word) for word in words[i:i+3]]
+        if not (1 <= row <= size and 1 <= col <= size and 1 <= val <= size):
+            raise ValueError('clue %d %d %d is out of range' % (row, col, val))
+
+def solve_text(task):
+    """Pool entry point: solves one (text, options, timeout) task and returns
+    its result record. Errors come back as records, a worker must not raise
+    or its caller would wait forever."""
+    text, options, timeout = task
+    try:
+        board = parse_text(text)
+        return solve_board(SudokuBoard(len(board), board), options, False, timeout)
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}
+
+class PendingSolve(object):
+    """A puzzle on its way through the pool and the requests waiting for it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.record = None
+        self.waiters = 1
+
+class SolveService(object):
+    """Dispatches puzzles to a process pool, coalescing identical ones and
+    refusing new ones past max_pending distinct puzzles in flight. A request
+    waits at most wait seconds for its result, by default 60 seconds more
+    than the timeout of a solve or 600 without one."""
+
+    def __init__(self, processes = None, max_pending = 64, timeout = None, options = None,
+        window = 10000, wait = None):
+        self.pool = multiprocessing.Pool(processes, init_worker)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        if wait is None:
+            wait = 600 if timeout is None else timeout + 60
+        self.wait = wait
+        self.options = options or {}
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.latencies = collections.deque(maxlen = window)
+        self.requests = 0
+        self.completed = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def submit(self, text, options = None):
+        """Solves a puzzle given in the .sudoku text format and returns its
+        result record. Raises ServiceBusy when the queue is full and
+        ValueError, before anything is queued, for a malformed puzzle, a
+        clue off the board or clues that conflict."""
+        options = dict(self.options, **(options or {}))
+        words = text.split()
+        if len(words) < 2:
+            raise ValueError('bad puzzle header')
+        size, count = int(words[0]), int(words[1])
+        check_header(size, count)
+        check_clues(size, count, words[2:])
+        board = parse_text(text)
+        if consistent_clues(SudokuBoard(len(board), board)) == False:
+            raise ValueError('the clues conflict')
+        key = (str(bytearray([value for row in board for value in row])), len(board),
+            tuple(sorted(options.items())))
+        start = time.time()
+
+        with self.lock:
+            self.requests += 1
+            entry = self.pending.get(key)
+            if entry is not None:
+                self.coalesced += 1
+                entry.waiters += 1
+            else:
+                if len(self.pending) >= self.max_pending:
+                    self.rejected += 1
+                    raise ServiceBusy('%d puzzles pending' % len(self.pending))
+                entry = self.pending[key] = PendingSolve()
+                self.pool.apply_async(solve_text, ((text, options, self.timeout),),
+                    callback = lambda record: self.finish(key, entry, record))
+
+        if entry.done.wait(self.wait) == False:
+            #a lost task must not hold its pending slot for good
+            with self.lock:
+                if self.pending.get(key) is entry:
+                    del self.pending[key]
+            raise ServiceTimeout('no result after %g seconds' % self.wait)
+        with self.lock:
+            self.completed += 1
+            self.latencies.append(time.time() - start)
+        return entry.record
+
+    def finish(self, key, entry, record):
+        """Pool callback: hands the record to every request waiting for it"""
+        with self.lock:
+            if self.pending.get(key) is entry:
+                del self.pending[key]
+        entry.record = record
+        entry.done.set()
+
+    def stats(self):
+        """Returns the counters, queue depth and latency percentiles"""
+        with self.lock:
+            latencies = list(self.latencies)
+            stats = {'requests': self.requests, 'completed': self.completed,
+                'coalesced': self.coalesced, 'rejected': self.rejected,
+                'pending': len(self.pending),
+                'waiting': sum([entry.waiters for entry in self.pending.values()])}
+        if len(latencies) > 0:
+            stats['p50'] = percentile(latencies, 0.5)
+            stats['p99'] = percentile(latencies, 0.99)
+        return stats
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+class SolveHandler(SocketServer.StreamRequestHandler):
+    """Answers the requests of one connection until it is closed"""
+
+    def reply(self, record):
+        self.wfile.write(json.dumps(record) + '\n')
+        self.wfile.flush()
+
+    def read_line(self):
+        """Reads one line of at most MAX_LINE bytes, '' at the end of the
+        connection. Raises ValueError for a longer line or one the connection
+        cuts off."""
+        line = self.rfile.readline(MAX_LINE)
+        if line != '' and line.endswith('\n') == False:
+            raise ValueError('line too long or cut short')
+        return line
+
+    def read_puzzle(self):
+        """Reads the size and count lines of a SOLVE request and one line per
+        clue, and returns them as .sudoku text"""
+        head = [self.read_line(), self.read_line()]
+        try:
+            check_header(int(head[0]), int(head[1]))
+        except ValueError as e:
+            raise ValueError('bad puzzle header: ' + str(e))
+        lines = []
+        for i in range(int(head[1])):
+            lines.append(self.read_line())
+            if lines[-1] == '':
+                raise ValueError('puzzle cut short')
+        return ''.join(head + lines)
+
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                line = self.read_line()
+            except ValueError as e:
+                self.reply({'status': 'error', 'error': str(e)})
+                return
+            if line == '':
+                return
+            words = line.split()
+            if len(words) == 0:
+                continue
+            command = words[0].upper()
+            if command == 'STATS':
+                self.reply(service.stats())
+            elif command == 'SOLVE':
+                unknown = [word for word in words[1:] if word not in FLAG_NAMES]
+                try:
+                    text = self.read_puzzle()
+                except ValueError as e:
+                    #the request can no longer be told apart from the next one
+                    self.reply({'status': 'error', 'error': str(e)})
+                    return
+                if len(unknown) > 0:
+                    self.reply({'status': 'error', 'error': 'unknown flags: ' + ' '.join(unknown)})
+                    continue
+                options = dict((FLAG_NAMES[word], True) for word in words[1:])
+                try:
+                    self.reply(service.submit(text, options))
+                except ServiceBusy as e:
+                    self.reply({'status': 'busy', 'error': str(e)})
+                except ServiceTimeout as e:
+                    self.reply({'status': 'error', 'error': str(e)})
+                except (ValueError, IndexError) as e:
+                    self.reply({'status': 'error', 'error': str(e)})
+            elif command == 'QUIT':
+                return
+            else:
+                self.reply({'status': 'error', 'error': 'unknown command ' + words[0]})
+
+class SolveServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """Threaded TCP server holding the SolveService its handlers share"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, service):
+        SocketServer.TCPServer.__init__(self, address, SolveHandler)
+        self.service = service
+
+class SolveClient(object):
+    """Connection to a SolveServer, e.g. SolveClient(('localhost', 8765))"""
+
+    def __init__(self, address):
+        self.sock = socket.create_connection(address)
+        self.file = self.sock.makefile('rwb')
+
+    def request(self, text):
+        self.file.write(text)
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def solve(self, text, flags = ()):
+        """Sends a puzzle in the .sudoku text format and returns its record"""
+        if not text.endswith('\n'):
+            text = text + '\n'
+        return self.request(' '.join(['SOLVE'] + list(flags)) + '\n' + text)
+
+    def stats(self):
+        return self.request('STATS\n')
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Serve sudoku solves over TCP.')
+    parser.add_argument('--host', default = 'localhost')
+    parser.add_argument('--port', type = int, default = 8765)
+    for flag, name in SOLVE_FLAGS:
+        parser.add_argument(flag, dest = name, action = 'store_true')
+    parser.add_argument('-j', '--processes', type = int, default = 0,
+        help = 'number of worker processes, 0 for one per core (default: 0)')
+    parser.add_argument('--max-pending', type = int, default = 64,
+        help = 'distinct puzzles in flight before requests are refused (default: 64)')
+    parser.add_argument('--timeout', type = float, default = None,
+        help = 'seconds allowed per puzzle before it is abandoned')
+    parser.add_argument('--wait', type = float, default = None,
+        help = 'seconds a request waits for its result (default: timeout + 60, or 600)')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    options = dict((name, True) for flag, name in SOLVE_FLAGS if getattr(args, name))
+    service = SolveService(args.processes or None, args.max_pending, args.timeout, options,
+        wait = args.wait)
+    server = SolveServer((args.host, args.port), service)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == '__main__':
+    main()
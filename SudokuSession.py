@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+"""Incremental solving for interactive play. A SolverSession keeps the
+forward checked domains of a puzzle between moves: placing a digit assigns
+it and propagates singles from the current state, and taking it back pops
+the trail, so a move costs a propagation instead of a cold solve. The last
+solution found is kept as long as the moves agree with it.
+
+    python SudokuSession.py input_puzzles/more/16x16/16x16.10.sudoku
+
+reads moves from stdin, one per line: "row col value" (one-indexed), "pop",
+"hint", "check" or "solve".
+"""
+import sys, time
+
+from SudokuStarter import (SudokuBoard, BitmaskState, SearchStats, ForwardChecker,
+    MRVQueue, ASSIGNED, init_board, consistent_clues, empty_peers, bitmask_solutions,
+    mask_values, propagate_naked_singles, propagate_hidden_singles)
+
+class SolverSession(object):
+    """Solver state of a board whose digits are placed and taken back one at
+    a time. The board given holds the clues and receives the placed digits;
+    the propagated cells are only kept in the session."""
+
+    def __init__(self, sudoku_board, propagators = (propagate_naked_singles,
+        propagate_hidden_singles), stats = None):
+        """Builds the domains of the empty cells and propagates the clues"""
+        if stats is None:
+            stats = SearchStats()
+        self.stats = stats
+        self.board = sudoku_board
+        self.work = sudoku_board.copy()
+        size = sudoku_board.BoardSize
+        self.empty = [(cell // size, cell % size) for cell in range(size*size)
+            if sudoku_board.cells[cell] == 0]
+        self.position = dict((cell, i) for i, cell in enumerate(self.empty))
+        self.visited = [0]*len(self.empty)
+        self.state = BitmaskState(sudoku_board)
+        self.peers = empty_peers(self.empty, self.state.subsquare)
+        self.queue = MRVQueue(self.state, self.empty, self.visited, self.peers)
+        self.checker = ForwardChecker(self.work, self.state, self.empty, self.visited,
+            self.peers, self.queue, propagators, stats)
+        #(row, col, trail mark) per placed digit, the mark is None when the
+        #digit did not touch the checker
+        self.moves = []
+        #number of moves from which on the board is contradictory, 0 for the clues
+        self.broken = None
+        #last solution cells, False when the board was shown to have none
+        self.solution = None
+        if (consistent_clues(sudoku_board) == False or 0 in self.checker.domains
+                or self.checker.propagate() == False):
+            self.broken = 0
+
+    def push(self, row, col, value):
+        """Places value at the zero-indexed cell and propagates it. Returns
+        False when the board can be seen to be contradictory now. The move
+        is kept either way, so pop always takes back the last push."""
+        i = self.position.get((row, col))
+        if i is None or self.board.get_value(row, col) != 0:
+            raise ValueError('cell %d, %d is not empty' % (row+1, col+1))
+        if value < 1 or value > self.board.BoardSize:
+            raise ValueError('value %d is out of range' % value)
+        self.board.set_value(row, col, value)
+
+        mark = None
+        if self.broken is None:
+            checker = self.checker
+            if self.visited[i] == 1:
+                #already forced by propagation
+                if self.work.get_value(row, col) != value:
+                    self.broken = len(self.moves) + 1
+            elif checker.domains[i] >> (value-1) & 1 == 0:
+                self.broken = len(self.moves) + 1
+            else:
+                mark = len(checker.trail)
+                if checker.assign(i, value) == False or checker.propagate() == False:
+                    self.broken = len(self.moves) + 1
+        self.moves.append((row, col, mark))
+
+        #a solution agreeing with the move still holds, none stays none
+        if self.solution and self.solution[row*self.board.BoardSize + col] != value:
+            self.solution = None
+        return self.broken is None
+
+    def pop(self):
+        """Takes back the last placed digit and returns its (row, col, value)"""
+        row, col, mark = self.moves.pop()
+        value = self.board.get_value(row, col)
+        self.board.set_value(row, col, 0)
+        if mark is not None:
+            self.checker.undo(mark)
+        if self.broken is not None and self.broken > len(self.moves):
+            self.broken = None
+        if self.solution == False:
+            #a contradiction may be gone, a solution stays one
+            self.solution = None
+        return row, col, value
+
+    def candidates(self, row, col):
+        """Returns the values the zero-indexed cell can still take"""
+        i = self.position.get((row, col))
+        if i is None or self.board.get_value(row, col) != 0 or self.visited[i] == 1:
+            return [self.work.get_value(row, col)]
+        return mask_values(self.checker.domains[i])
+
+    def forced(self):
+        """Returns the (row, col, value) of the first cell propagation has
+        filled in that the board is still missing, or None"""
+        if self.broken is not None:
+            return None
+        for kind, i, value in self.checker.trail:
+            if kind == ASSIGNED:
+                row, col = self.empty[i]
+                if self.board.get_value(row, col) == 0:
+                    return row, col, value
+        return None
+
+    def search(self, time_limit = None, node_limit = None):
+        """Searches on from the propagated state for a solution and keeps it.
+        The domains are put back afterwards, also when the limits raise
+        SearchLimit."""
+        if time_limit is not None:
+            self.stats.deadline = time.time() + time_limit
+        if node_limit is not None:
+            self.stats.node_limit = self.stats.nodes + node_limit
+        checker = self.checker
+        mark = len(checker.trail)
+        found = bitmask_solutions(self.work, self.state, self.empty, self.visited, 0, True,
+            False, False, self.queue, checker, self.stats, self.peers)
+        try:
+            if next(found, False) == True:
+                self.solution = bytearray(self.work.cells)
+            else:
+                self.solution = False
+        finally:
+            found.close()
+            checker.undo(mark)
+            self.stats.deadline = None
+            self.stats.node_limit = None
+
+    def is_solvable(self, time_limit = None, node_limit = None):
+        """Returns True when the board can still be completed"""
+        if self.broken is not None:
+            return False
+        if self.solution is None:
+            self.search(time_limit, node_limit)
+        return self.solution != False
+
+    def solved_board(self, time_limit = None, node_limit = None):
+        """Returns a completed copy of the board, or None when there is none"""
+        if self.is_solvable(time_limit, node_limit) == False:
+            return None
+        return SudokuBoard(self.board.BoardSize, bytearray(self.solution))
+
+    def hint(self, time_limit = None, node_limit = None):
+        """Returns the (row, col, value) of a cell to fill next: a forced cell
+        when there is one, otherwise the first empty cell of the solution.
+        None when the board cannot be completed."""
+        forced = self.forced()
+        if forced is not None:
+            return forced
+        if self.is_solvable(time_limit, node_limit) == False:
+            return None
+        size = self.board.BoardSize
+        for cell in range(size*size):
+            if self.board.cells[cell] == 0:
+                return cell // size, cell % size, self.solution[cell]
+        return None
+
+def answer(session, words):
+    """Carries out one move or query of the command line session and returns
+    the reply"""
+    if words[0] == 'pop':
+        if len(session.moves) == 0:
+            return 'nothing to take back'
+        row, col, value = session.pop()
+        return 'took back %d at %d, %d' % (value, row+1, col+1)
+    elif words[0] == 'hint':
+        hint = session.hint()
+        if hint is None:
+            return 'no solution'
+        return '%d at %d, %d' % (hint[2], hint[0]+1, hint[1]+1)
+    elif words[0] == 'check':
+        return 'solvable' if session.is_solvable() else 'not solvable'
+    elif words[0] == 'solve':
+        board = session.solved_board()
+        if board is None:
+            return 'no solution'
+        board.print_board()
+        return 'solved'
+    row, col, value = [int(word) for word in words]
+    return 'ok' if session.push(row-1, col-1, value) else 'contradiction'
+
+def main(argv = None):
+    argv = sys.argv[1:] if argv is None else argv
+    session = SolverSession(init_board(argv[0]))
+    for line in sys.stdin:
+        words = line.split()
+        if len(words) == 0:
+            continue
+        start_time = time.time()
+        try:
+            reply = answer(session, words)
+        except ValueError as e:
+            reply = 'error: ' + str(e)
+        print reply, '(%.4fs)' % (time.time() - start_time)
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,62 @@
 #!/usr/bin/env python
-import struct, string, math, time
+import struct, string, math, time, random
+from collections import OrderedDict
 
-class SudokuBoard:
-    """This will be the sudoku board game object your player will manipulate."""
+class SudokuBoard(object):
+    """This will be the sudoku board game object your player will manipulate.
+    The cells are stored row by row in one flat bytearray, so a board costs
+    size*size bytes and assignments change it in place."""
+
+    __slots__ = ('BoardSize', 'cells')
 
     def __init__(self, size, board):
-      """the constructor for the SudokuBoard"""
+      """the constructor for the SudokuBoard, board is either a list of rows
+      or a flat sequence of size*size values"""
       self.BoardSize = size #the size of the board
-      self.CurrentGameBoard= board #the current state of the game board
+      if len(board) == size*size and not isinstance(board[0], (list, tuple)):
+          self.cells = bytearray(board)
+      else:
+          self.cells = bytearray([value for row in board for value in row])
+
+    def get_CurrentGameBoard(self):
+        """Returns a copy of the board as a list of rows"""
+        size = self.BoardSize
+        cells = self.cells
+        return [list(cells[row*size:(row+1)*size]) for row in range(size)]
+
+    def set_CurrentGameBoard(self, board):
+        """Replaces the cells with the values of a list of rows"""
+        self.cells = bytearray([value for row in board for value in row])
+
+    #the current state of the game board; writes to the returned rows do not
+    #reach the board, use set_value instead
+    CurrentGameBoard = property(get_CurrentGameBoard, set_CurrentGameBoard)
+
+    def get_value(self, row, col):
+        """Returns the value at a zero-indexed row and col, 0 when empty"""
+        return self.cells[row*self.BoardSize + col]
 
     def set_value(self, row, col, value):
-        """This function will create a new sudoku board object with the input
-        value placed on the GameBoard row and col are both zero-indexed"""
+        """Places value on the GameBoard in place, row and col are both
+        zero-indexed. Returns the board itself."""
+        self.cells[row*self.BoardSize + col] = value
+        return self
+
+    def snapshot(self):
+        """Returns a copy of the cells that restore can put back"""
+        return bytes(self.cells)
 
-        #add the value to the appropriate position on the board
-        self.CurrentGameBoard[row][col]=value
-        #return a new board of the same size with the value added
-        return SudokuBoard(self.BoardSize, self.CurrentGameBoard)
+    def restore(self, snapshot):
+        """Puts back the cells saved by snapshot without reallocating"""
+        self.cells[:] = snapshot
 
+    def copy(self):
+        """Returns an independent board with the same cells"""
+        return SudokuBoard(self.BoardSize, self.cells)
 
     def print_board(self):
         """Prints the current game board. Leaves unassigned spots blank."""
+        BoardArray = self.CurrentGameBoard
         div = int(math.sqrt(self.BoardSize))
         dash = ""
         space = ""
@@ -36,10 +72,10 @@ class SudokuBoard:
             if i != -1:
                 print "|",
                 for j in range(self.BoardSize):
-                    if self.CurrentGameBoard[i][j] > 9:
-                        print self.CurrentGameBoard[i][j],
-                    elif self.CurrentGameBoard[i][j] > 0:
-                        print "", self.CurrentGameBoard[i][j],
+                    if BoardArray[i][j] > 9:
+                        print BoardArray[i][j],
+                    elif BoardArray[i][j] > 0:
+                        print "", BoardArray[i][j],
                     else:
                         print "  ",
                     if (j+1 != self.BoardSize):
@@ -54,57 +90,104 @@ class SudokuBoard:
             else:
                 print sep
 
-def parse_file(filename):
-    """Parses a sudoku text file into a BoardSize, and a 2d array which holds
-    the value of each cell. Array elements holding a 0 are considered to be
-    empty."""
-
-    f = open(filename, 'r')
-    BoardSize = int( f.readline())
-    NumVals = int(f.readline())
+def parse_text(text):
+    """Parses the contents of a sudoku text file into a 2d array which holds
+    the value of each cell. The whole text is split at once instead of line
+    by line."""
+    fields = text.split()
+    BoardSize = int(fields[0])
+    NumVals = int(fields[1])
 
     #initialize a blank board
     board= [ [ 0 for i in range(BoardSize) ] for j in range(BoardSize) ]
 
     #populate the board with initial values
-    for i in range(NumVals):
-        line = f.readline()
-        chars = line.split()
-        row = int(chars[0])
-        col = int(chars[1])
-        val = int(chars[2])
+    for i in range(2, 2 + 3*NumVals, 3):
+        row = int(fields[i])
+        col = int(fields[i+1])
+        val = int(fields[i+2])
         board[row-1][col-1]=val
 
     return board
 
+def parse_file(filename):
+    """Parses a sudoku text file into a BoardSize, and a 2d array which holds
+    the value of each cell. Array elements holding a 0 are considered to be
+    empty."""
+    with open(filename, 'r') as f:
+        return parse_text(f.read())
+
+def format_board(sudoku_board):
+    """Returns the board in the text format read by parse_text: the size, the
+    number of filled cells and one tab separated row, col, value line each"""
+    size = sudoku_board.BoardSize
+    cells = sudoku_board.cells
+    lines = ['%d\t%d\t%d' % (cell // size + 1, cell % size + 1, cells[cell])
+             for cell in range(size*size) if cells[cell] != 0]
+    return '%d\n%d\n' % (size, len(lines)) + ''.join([line + '\n' for line in lines])
+
+class BoardGeometry(object):
+    """Row, column and square layout of a board size, built once. Cells are
+    numbered row*size+col; box maps a cell to its square, units lists the
+    cells of every row, column and square and peers lists the other cells
+    sharing a unit with each cell"""
+
+    def __init__(self, size):
+        self.size = size
+        self.subsquare = int(math.sqrt(size))
+        subsquare = self.subsquare
+        cells = range(size*size)
+        self.box = [(cell // size // subsquare)*subsquare
+                    + cell % size // subsquare for cell in cells]
+        rows = [[row*size + col for col in range(size)] for row in range(size)]
+        cols = [[row*size + col for row in range(size)] for col in range(size)]
+        squares = [[] for i in range(size)]
+        for cell in cells:
+            squares[self.box[cell]].append(cell)
+        self.units = rows + cols + squares
+        self.cell_units = [[] for cell in cells]
+        for unit in self.units:
+            for cell in unit:
+                self.cell_units[cell].append(unit)
+        self.peers = []
+        for cell in cells:
+            neighbours = set()
+            for unit in self.cell_units[cell]:
+                neighbours.update(unit)
+            neighbours.discard(cell)
+            self.peers.append(sorted(neighbours))
+
+_GEOMETRY = {}
+
+def get_geometry(size):
+    """Returns the shared BoardGeometry of a board size"""
+    geometry = _GEOMETRY.get(size)
+    if geometry is None:
+        geometry = _GEOMETRY[size] = BoardGeometry(size)
+    return geometry
+
 def is_complete(sudoku_board):
     """Takes in a sudoku board and tests to see if it has been filled in
     correctly."""
-    BoardArray = sudoku_board.CurrentGameBoard
-    size = len(BoardArray)
-    subsquare = int(math.sqrt(size))
+    cells = sudoku_board.cells
+    size = sudoku_board.BoardSize
+    expected = set(range(1, size+1))
 
-    #check each cell on the board for a 0, or if the value of the cell
-    #is present elsewhere within the same row, column, or square
-    for row in range(size):
-        for col in range(size):
-            if BoardArray[row][col]==0:
-                return False
-            for i in range(size):
-                if ((BoardArray[row][i] == BoardArray[row][col]) and i != col):
-                    return False
-                if ((BoardArray[i][col] == BoardArray[row][col]) and i != row):
-                    return False
-            #determine which square the cell is in
-            SquareRow = row // subsquare
-            SquareCol = col // subsquare
-            for i in range(subsquare):
-                for j in range(subsquare):
-                    if((BoardArray[SquareRow*subsquare+i][SquareCol*subsquare+j]
-                            == BoardArray[row][col])
-                        and (SquareRow*subsquare + i != row)
-                        and (SquareCol*subsquare + j != col)):
-                            return False
+    #every row, column and square must hold each value exactly once
+    for unit in get_geometry(size).units:
+        if set([cells[cell] for cell in unit]) != expected:
+            return False
+    return True
+
+def consistent_clues(sudoku_board):
+    """Returns True when every clue is in range and no row, column or square
+    holds a value twice, the least a board needs to have a solution"""
+    cells = sudoku_board.cells
+    size = sudoku_board.BoardSize
+    for unit in get_geometry(size).units:
+        clues = [cells[cell] for cell in unit if cells[cell] != 0]
+        if len(set(clues)) != len(clues) or max(clues or [0]) > size:
+            return False
     return True
 
 def init_board(file_name):
@@ -114,32 +197,24 @@ def init_board(file_name):
 
 def is_valid(sudoku_board, row, col, value):
     """Check whether it would be valid to put value at the input position"""
-    BoardArray = sudoku_board.CurrentGameBoard
-    size = len(BoardArray)
-    subsquare = int(math.sqrt(size))
-    SquareRow = row // subsquare
-    SquareCol = col // subsquare
-
-    for i in range(size):
-        if BoardArray[row][i] == value:
-            return False
-        if BoardArray[i][col] == value:
+    cells = sudoku_board.cells
+    size = sudoku_board.BoardSize
+    cell = row*size + col
+
+    if cells[cell] == value:
+        return False
+    for peer in get_geometry(size).peers[cell]:
+        if cells[peer] == value:
             return False
 
-    for i in range(subsquare):
-        for j in range(subsquare):
-            if BoardArray[SquareRow*subsquare+i][SquareCol*subsquare+j] == value:
-                return False
-
     return True
 
 
 def MRV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
     """MRV_check recursively searches the right value to fill the board
     and return True if a solution is found otherwise return False"""
-    BoardArray = initial_board.CurrentGameBoard
     size = initial_board.BoardSize
-    subsquare = int(math.sqrt(initial_board.BoardSize))
+    box = get_geometry(size).box
 
     #compute the variable with the minimum remaining values
     minValue = 1000
@@ -152,11 +227,9 @@ def MRV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
         tc = cell[1]
         if visited[i] == 0:
             num_empty = num_empty + 1
-            Squaretr = tr // subsquare
-            Squaretc = tc // subsquare
             temp = 0
             for j in range(size):
-                if rowmap[tr][j] == 0 and colmap[tc][j] == 0 and sqrmap[Squaretr*subsquare+Squaretc][j] == 0:
+                if rowmap[tr][j] == 0 and colmap[tc][j] == 0 and sqrmap[box[tr*size+tc]][j] == 0:
                     temp = temp + 1
             if temp < minValue:
                 minValue = temp
@@ -168,18 +241,17 @@ def MRV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
     currentCell = empty[minIndex]
     row = currentCell[0]
     col = currentCell[1]
-    SquareRow = row // subsquare
-    SquareCol = col // subsquare
+    square = box[row*size+col]
 
     visited[minIndex] = 1
     for num in range(1,initial_board.BoardSize+1):
         #if num doesn't exit in its row, col nor square
-        if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[SquareRow*subsquare+SquareCol][num-1] == 0:
+        if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[square][num-1] == 0:
             initial_board.set_value(row, col, num)
             #mark the map
             rowmap[row][num-1] = 1
             colmap[col][num-1] = 1
-            sqrmap[SquareRow*subsquare+SquareCol][num-1] = 1
+            sqrmap[square][num-1] = 1
 
             #success
             if MRV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap) == True:
@@ -189,7 +261,7 @@ def MRV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
                 #initial_board.set_value(row, col, 0)
                 rowmap[row][num-1] = 0
                 colmap[col][num-1] = 0
-                sqrmap[SquareRow*subsquare+SquareCol][num-1] = 0
+                sqrmap[square][num-1] = 0
 
 
     visited[minIndex] = 0
@@ -198,9 +270,8 @@ def MRV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
 def degree_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
     """degree_checking recursively searches the right value to fill the board
     and return True if a solution is found otherwise return False"""
-    BoardArray = initial_board.CurrentGameBoard
     size = initial_board.BoardSize
-    subsquare = int(math.sqrt(initial_board.BoardSize))
+    box = get_geometry(size).box
 
     #compute the variable invloved with the largest constraint on unassigned variables
     maxValue = -1
@@ -213,15 +284,13 @@ def degree_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
         tc = cell[1]
         if visited[i] == 0:
             num_empty = num_empty + 1
-            Squaretr = tr // subsquare
-            Squaretc = tc // subsquare
             temp = 0
             for j in range(size):
                 if rowmap[tr][j] == 0:
                     temp = temp + 1
                 if colmap[tc][j] == 0:
                     temp = temp + 1
-                if sqrmap[Squaretr*subsquare+Squaretc][j] == 0:
+                if sqrmap[box[tr*size+tc]][j] == 0:
                     temp = temp + 1
             if temp > maxValue:
                 maxValue = temp
@@ -233,18 +302,17 @@ def degree_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
     currentCell = empty[maxIndex]
     row = currentCell[0]
     col = currentCell[1]
-    SquareRow = row // subsquare
-    SquareCol = col // subsquare
+    square = box[row*size+col]
 
     visited[maxIndex] = 1
     for num in range(1,initial_board.BoardSize+1):
         #if num doesn't exit in its row, col nor square
-        if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[SquareRow*subsquare+SquareCol][num-1] == 0:
+        if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[square][num-1] == 0:
             initial_board.set_value(row, col, num)
             #mark the map
             rowmap[row][num-1] = 1
             colmap[col][num-1] = 1
-            sqrmap[SquareRow*subsquare+SquareCol][num-1] = 1
+            sqrmap[square][num-1] = 1
 
             #success
             if degree_checking(initial_board, empty, visited, rowmap, colmap, sqrmap) == True:
@@ -253,13 +321,13 @@ def degree_checking(initial_board, empty, visited, rowmap, colmap, sqrmap):
                 #fail -> unmark the map
                 rowmap[row][num-1] = 0
                 colmap[col][num-1] = 0
-                sqrmap[SquareRow*subsquare+SquareCol][num-1] = 0
+                sqrmap[square][num-1] = 0
 
 
     visited[maxIndex] = 0
     return False
 
-def LCV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap, index):
+def LCV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap, index, peers = None):
     """LCV_check recursively searches the right value to fill the board
     and return True if a solution is found otherwise return False"""
 
@@ -271,102 +339,123 @@ def LCV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap, index):
     row = currentCell[0]
     col = currentCell[1]
 
-    subsquare = int(math.sqrt(initial_board.BoardSize))
-    SquareRow = row // subsquare
-    SquareCol = col // subsquare
-
-
-    used_value = [0]*size
-    for j in range(size):
-        if rowmap[row][j] == 1:
-            used_value[j] = 1
-        if colmap[col][j] == 1:
-            used_value[j] = 1
-        if sqrmap[SquareRow*subsquare+SquareCol][j] == 1:
-            used_value[j] = 1
-
+    box = get_geometry(size).box
+    square = box[row*size+col]
+    if peers is None:
+        peers = empty_peers(empty, get_geometry(size).subsquare)
 
     visited[index] = 1
-    while sum(used_value) != size:
-        minSum = 1000
-        temp_sum = 0
-        bestValue = 1
-        for num in range(1,initial_board.BoardSize+1):
-            if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[SquareRow*subsquare+SquareCol][num-1] == 0:
-                #haven't tried this value yet
-                if used_value[num-1] == 0:
-                    #compute its impact on other unassigned
-                    for i in range(len(empty)):
-                        if visited[i] == 0:
-                            temprow = empty[i][0]
-                            tempcol = empty[i][1]
-                            temprowsub = temprow // subsquare
-                            tempcolsub = tempcol // subsquare
-                            if temprow == row:
-                                if colmap[tempcol][num-1] == 0:
-                                    temp_sum = temp_sum + 1
-                                if sqrmap[temprowsub*subsquare+tempcolsub][num-1] == 0:
-                                    temp_sum = temp_sum + 1
-                            if tempcol == col:
-                                if rowmap[temprow][num-1] == 0:
-                                    temp_sum = temp_sum + 1
-                                if sqrmap[temprowsub*subsquare+tempcolsub][num-1] == 0:
-                                    temp_sum = temp_sum + 1
-                            if temprowsub*subsquare+tempcolsub == SquareRow*subsquare+SquareCol:
-                                if colmap[tempcol][num-1] == 0:
-                                    temp_sum = temp_sum + 1
-                                if rowmap[temprow][num-1] == 0:
-                                    temp_sum = temp_sum + 1
-                    if temp_sum < minSum:
-                        minSum = temp_sum
-                        bestValue = num
-
-        #first try the best value
+    for bestValue in LCV_values(empty, visited, rowmap, colmap, sqrmap, index, size, peers):
         initial_board.set_value(row, col, bestValue)
-        used_value[bestValue-1] = 1
         #mark the map
         rowmap[row][bestValue-1] = 1
         colmap[col][bestValue-1] = 1
-        sqrmap[SquareRow*subsquare+SquareCol][bestValue-1] = 1
+        sqrmap[square][bestValue-1] = 1
 
         #success
-        if LCV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap, index+1) == True:
+        if LCV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap, index+1, peers) == True:
             return True
         else:
             #fail -> unmark the map
             rowmap[row][bestValue-1] = 0
             colmap[col][bestValue-1] = 0
-            sqrmap[SquareRow*subsquare+SquareCol][bestValue-1] = 0
+            sqrmap[square][bestValue-1] = 0
 
     visited[index] = 0
 
     return False
 
-def forward_check(initial_board, empty, visited, rowmap, colmap, sqrmap, index, MRV = False, Degree = False,
-    LCV = False):
-    """forward_check recursively searches the right value to fill the board
-    and return True if a solution is found otherwise return False"""
-
-    BoardArray = initial_board.CurrentGameBoard
-    size = initial_board.BoardSize
-    subsquare = int(math.sqrt(initial_board.BoardSize))
+class SearchLimit(Exception):
+    """Raised in the middle of a search that runs past its node limit or
+    deadline or gets cancelled. status is 'budget', 'timeout' or 'cancelled'"""
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+class SearchStats(object):
+    """Counters and timers filled in by the search engines while solving one
+    board. Times are in seconds"""
+
+    def __init__(self):
+        self.solved = False
+        self.status = None          #solved, unsolved, or why the search stopped
+        self.nodes = 0              #values placed by the search
+        self.backtracks = 0         #placed values taken back after a dead end
+        self.max_depth = 0          #most cells assigned by branching at once
+        self.candidate_checks = 0   #candidate values examined for a cell
+        self.propagated = 0         #cells assigned by the propagators
+        self.pruned = 0             #values removed from the domains of peers
+        self.select_time = 0.0      #picking the next cell
+        self.order_time = 0.0       #finding and ordering the values of a cell
+        self.assign_time = 0.0      #placing, propagating and taking back values
+        self.backjumps = 0          #dead ends that jumped over more than one level
+        self.levels_skipped = 0     #levels jumped over without retrying their values
+        self.nogoods_learned = 0    #conflict sets stored as nogoods
+        self.nogood_prunes = 0      #values rejected by a stored nogood
+        self.restarts = 0           #randomized runs abandoned to start over
+        self.elapsed = 0.0
+        self.node_limit = None      #nodes allowed before SearchLimit is raised
+        self.deadline = None        #time.time() after which SearchLimit is raised
+        self.cancel = None          #threading or multiprocessing Event, set to stop
+
+    def check_limit(self):
+        """Raises SearchLimit once the search has placed more than node_limit
+        values, passed its deadline or been cancelled. The engines call it
+        once per step."""
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchLimit('budget', 'search gave up after %d nodes' % self.nodes)
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchLimit('timeout', 'search ran past its deadline')
+        if self.cancel is not None and self.cancel.is_set():
+            raise SearchLimit('cancelled', 'search was cancelled')
+
+    def add(self, other):
+        """Adds the counters and timers of another search to these"""
+        for name in ('nodes', 'backtracks', 'candidate_checks', 'propagated', 'pruned',
+                'select_time', 'order_time', 'assign_time', 'backjumps', 'levels_skipped',
+                'nogoods_learned', 'nogood_prunes', 'restarts'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+
+    def as_dict(self):
+        """Returns the counters and timers as a plain dict"""
+        record = dict(self.__dict__)
+        del record['cancel']
+        return record
+
+    def __repr__(self):
+        return 'SearchStats(%s)' % ', '.join('%s=%r' % item
+            for item in sorted(self.__dict__.items()))
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of a non empty list"""
+    values = sorted(values)
+    rank = int(round(fraction * (len(values) - 1)))
+    return values[rank]
+
+def median(values):
+    return percentile(values, 0.5)
+
+def select_variable(empty, visited, rowmap, colmap, sqrmap, index, size, MRV = False,
+    Degree = False):
+    """Returns the index in empty of the next cell to fill, or -1 when every
+    cell has been assigned. Without MRV or Degree the cells are taken in order
+    and index is the position reached by the search"""
+    box = get_geometry(size).box
+    targetIndex = -1
 
     if MRV == True:
         #compute the variable with the minimum remaining values
         minValue = 1000
-        num_empty = 0
-
         for i in range(len(empty)):
             cell = empty[i]
             tr = cell[0]
             tc = cell[1]
             if visited[i] == 0:
-                num_empty = num_empty + 1
-                Squaretr = tr // subsquare
-                Squaretc = tc // subsquare
                 temp = 0
                 for j in range(size):
-                    if rowmap[tr][j] == 0 and colmap[tc][j] == 0 and sqrmap[Squaretr*subsquare+Squaretc][j] == 0:
+                    if rowmap[tr][j] == 0 and colmap[tc][j] == 0 and sqrmap[box[tr*size+tc]][j] == 0:
                         temp = temp + 1
                 if temp < minValue:
                     minValue = temp
@@ -374,266 +463,1067 @@ def forward_check(initial_board, empty, visited, rowmap, colmap, sqrmap, index,
     elif Degree == True:
         #compute the variable invloved with the largest constraint on unassigned variables
         maxValue = -1
-        num_empty = 0
-
         for i in range(len(empty)):
             cell = empty[i]
             tr = cell[0]
             tc = cell[1]
             if visited[i] == 0:
-                num_empty = num_empty + 1
-                Squaretr = tr // subsquare
-                Squaretc = tc // subsquare
                 temp = 0
                 for j in range(size):
                     if rowmap[tr][j] == 0:
                         temp = temp + 1
                     if colmap[tc][j] == 0:
                         temp = temp + 1
-                    if sqrmap[Squaretr*subsquare+Squaretc][j] == 0:
+                    if sqrmap[box[tr*size+tc]][j] == 0:
                         temp = temp + 1
                 if temp > maxValue:
                     maxValue = temp
-                    targetIndex= i
-    else:
+                    targetIndex = i
+    elif index < len(empty):
         targetIndex = index
 
-    if MRV == False and Degree == False:
-        if index == len(empty):
-            return True
-    else:
-        if num_empty == 0:
-            return True
+    return targetIndex
 
-    currentCell = empty[targetIndex]
-    row = currentCell[0]
-    col = currentCell[1]
-    SquareRow = row // subsquare
-    SquareCol = col // subsquare
-
-    visited[targetIndex] = 1
-    if LCV == False:
-        for num in range(1,initial_board.BoardSize+1):
-            #if num doesn't exit in its row, col nor square
-            if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[SquareRow*subsquare+SquareCol][num-1] == 0:
+def LCV_values(empty, visited, rowmap, colmap, sqrmap, targetIndex, size, peers):
+    """Returns the values allowed at the cell by the maps, least constraining
+    first: a value costs one for every unassigned peer (from the precomputed
+    peers table) that could still hold it"""
+    box = get_geometry(size).box
+    row = empty[targetIndex][0]
+    col = empty[targetIndex][1]
+    square = box[row*size+col]
+
+    values = [num for num in range(1, size+1)
+        if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[square][num-1] == 0]
+    if len(values) < 2:
+        return values
+
+    impact = [0]*(size+1)
+    for i in peers[targetIndex]:
+        if visited[i] == 0:
+            tr = empty[i][0]
+            tc = empty[i][1]
+            rowused = rowmap[tr]
+            colused = colmap[tc]
+            sqrused = sqrmap[box[tr*size+tc]]
+            for num in values:
+                if rowused[num-1] == 0 and colused[num-1] == 0 and sqrused[num-1] == 0:
+                    impact[num] = impact[num] + 1
+    values.sort(key = lambda num: impact[num])
+    return values
+
+def forward_check(initial_board, empty, visited, rowmap, colmap, sqrmap, index, MRV = False, Degree = False,
+    LCV = False, stats = None, peers = None):
+    """forward_check searches the right value to fill the board and return True
+    if a solution is found otherwise return False."""
+    return next(forward_check_solutions(initial_board, empty, visited, rowmap, colmap, sqrmap,
+        index, MRV, Degree, LCV, stats, peers), False)
+
+def forward_check_solutions(initial_board, empty, visited, rowmap, colmap, sqrmap, index,
+    MRV = False, Degree = False, LCV = False, stats = None, peers = None):
+    """Generates True every time the board holds a solution, searching on past
+    it when resumed. Instead of recursing once per cell it keeps an explicit
+    stack of [cell, values left, current value] frames. The counters and
+    timers of stats are updated as it goes. LCV uses the peers table of the
+    empty cells, built here when it is not given."""
+
+    if stats is None:
+        stats = SearchStats()
+    timer = time.time
+    size = initial_board.BoardSize
+    box = get_geometry(size).box
+    if LCV == True and peers is None:
+        peers = empty_peers(empty, get_geometry(size).subsquare)
+    stack = []
+
+    while True:
+        stats.check_limit()
+        start = timer()
+        targetIndex = select_variable(empty, visited, rowmap, colmap, sqrmap,
+            index+len(stack), size, MRV, Degree)
+        stats.select_time += timer() - start
+        if targetIndex == -1:
+            #a solution: resuming moves on to the next value of the last cell
+            yield True
+        else:
+            start = timer()
+            row = empty[targetIndex][0]
+            col = empty[targetIndex][1]
+            square = box[row*size+col]
+            if LCV == True:
+                values = iter(LCV_values(empty, visited, rowmap, colmap, sqrmap, targetIndex, size, peers))
+            else:
+                #the values that don't exist in its row, col nor square
+                values = iter([num for num in range(1, size+1)
+                    if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0
+                    and sqrmap[square][num-1] == 0])
+            stats.candidate_checks += size
+            stats.order_time += timer() - start
+            visited[targetIndex] = 1
+            stack.append([targetIndex, values, 0])
+            stats.max_depth = max(stats.max_depth, len(stack))
+
+        #move to the next value, dropping the frames that ran out of values
+        while len(stack) > 0:
+            frame = stack[-1]
+            targetIndex = frame[0]
+            num = frame[2]
+            row = empty[targetIndex][0]
+            col = empty[targetIndex][1]
+            square = box[row*size+col]
+            if num != 0:
+                #fail -> unmark the map
+                stats.backtracks += 1
+                rowmap[row][num-1] = 0
+                colmap[col][num-1] = 0
+                sqrmap[square][num-1] = 0
+
+            num = next(frame[1], 0)
+            frame[2] = num
+            if num != 0:
+                start = timer()
+                stats.nodes += 1
                 initial_board.set_value(row, col, num)
                 #mark the map
                 rowmap[row][num-1] = 1
                 colmap[col][num-1] = 1
-                sqrmap[SquareRow*subsquare+SquareCol][num-1] = 1
+                sqrmap[square][num-1] = 1
+                stats.assign_time += timer() - start
+                break
+
+            visited[targetIndex] = 0
+            stack.pop()
+
+        if len(stack) == 0:
+            return
+
+def backtrack(initial_board, empty, visited, rowmap, colmap, sqrmap, index, MRV, Degree, LCV,
+    stats = None, peers = None):
+    """Backtrack searches the right value to fill the board and return True if
+    a solution is found otherwise return False."""
+    return next(backtrack_solutions(initial_board, empty, visited, rowmap, colmap, sqrmap,
+        index, MRV, Degree, LCV, stats, peers), False)
+
+def backtrack_solutions(initial_board, empty, visited, rowmap, colmap, sqrmap, index, MRV, Degree,
+    LCV, stats = None, peers = None):
+    """Generates True every time the board holds a solution, searching on past
+    it when resumed. Like forward_check_solutions it keeps an explicit stack of
+    frames and updates stats, and checks every value against the board."""
+
+    if stats is None:
+        stats = SearchStats()
+    timer = time.time
+    size = initial_board.BoardSize
+    if LCV == True and peers is None:
+        peers = empty_peers(empty, get_geometry(size).subsquare)
+    stack = []
+
+    while True:
+        stats.check_limit()
+        start = timer()
+        targetIndex = select_variable(empty, visited, rowmap, colmap, sqrmap,
+            index+len(stack), size, MRV, Degree)
+        stats.select_time += timer() - start
+        if targetIndex == -1:
+            #a solution: resuming moves on to the next value of the last cell
+            yield True
+        else:
+            row = empty[targetIndex][0]
+            col = empty[targetIndex][1]
+            if LCV == True:
+                start = timer()
+                values = iter(LCV_values(empty, visited, rowmap, colmap, sqrmap, targetIndex, size, peers))
+                stats.order_time += timer() - start
+            else:
+                values = iter(range(1, size+1))
+            visited[targetIndex] = 1
+            stack.append([targetIndex, values, 0])
+            stats.max_depth = max(stats.max_depth, len(stack))
+
+        #move to the next valid value, dropping the frames that ran out of values
+        while len(stack) > 0:
+            frame = stack[-1]
+            targetIndex = frame[0]
+            row = empty[targetIndex][0]
+            col = empty[targetIndex][1]
+            if frame[2] != 0:
+                stats.backtracks += 1
+                initial_board.set_value(row, col, 0)
 
-                #success
-                if forward_check(initial_board, empty, visited, rowmap, colmap, sqrmap, index+1, MRV, Degree, LCV) == True:
-                    return True
-                else:
-                    rowmap[row][num-1] = 0
-                    colmap[col][num-1] = 0
-                    sqrmap[SquareRow*subsquare+SquareCol][num-1] = 0
-    elif LCV == True:
-        used_value = [0]*size
-        for j in range(size):
-            if rowmap[row][j] == 1:
-                used_value[j] = 1
-            if colmap[col][j] == 1:
-                used_value[j] = 1
-            if sqrmap[SquareRow*subsquare+SquareCol][j] == 1:
-                used_value[j] = 1
-        while sum(used_value) != size:
-            minSum = 1000
-            temp_sum = 0
-            bestValue = 1
-            for num in range(1,initial_board.BoardSize+1):
-                if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[SquareRow*subsquare+SquareCol][num-1] == 0:
-                    #haven't tried this value yet
-                    if used_value[num-1] == 0:
-                        #compute its impact on other unassigned
-                        for i in range(len(empty)):
-                            if visited[i] == 0:
-                                temprow = empty[i][0]
-                                tempcol = empty[i][1]
-                                temprowsub = temprow // subsquare
-                                tempcolsub = tempcol // subsquare
-                                if temprow == row:
-                                    if colmap[tempcol][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                    if sqrmap[temprowsub*subsquare+tempcolsub][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                if tempcol == col:
-                                    if rowmap[temprow][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                    if sqrmap[temprowsub*subsquare+tempcolsub][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                if temprowsub*subsquare+tempcolsub == SquareRow*subsquare+SquareCol:
-                                    if colmap[tempcol][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                    if rowmap[temprow][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                        if temp_sum < minSum:
-                            minSum = temp_sum
-                            bestValue = num
-
-            #first try the best value
-            initial_board.set_value(row, col, bestValue)
-            used_value[bestValue-1] = 1
-            #mark the map
-            rowmap[row][bestValue-1] = 1
-            colmap[col][bestValue-1] = 1
-            sqrmap[SquareRow*subsquare+SquareCol][bestValue-1] = 1
+            start = timer()
+            num = next(frame[1], 0)
+            while num != 0:
+                stats.candidate_checks += 1
+                if is_valid(initial_board, row, col, num) == True:
+                    break
+                num = next(frame[1], 0)
+            stats.order_time += timer() - start
+            frame[2] = num
+            if num != 0:
+                stats.nodes += 1
+                initial_board.set_value(row, col, num)
+                break
+
+            visited[targetIndex] = 0
+            stack.pop()
+
+        if len(stack) == 0:
+            return
+
+
+def popcount(mask):
+    """Returns the number of set bits in mask"""
+    return bin(mask).count("1")
+
+class BitmaskState(object):
+    """Constraint state of a board where each row, column and square is stored
+    as a single integer bitmask. Bit num-1 is set when num is used in the unit."""
+
+    def __init__(self, sudoku_board):
+        """Builds the row, column and square masks from the board clues"""
+        BoardArray = sudoku_board.CurrentGameBoard
+        self.size = sudoku_board.BoardSize
+        self.subsquare = int(math.sqrt(self.size))
+        self.box = get_geometry(self.size).box
+        self.full = (1 << self.size) - 1
+        self.rowmask = [0]*self.size
+        self.colmask = [0]*self.size
+        self.sqrmask = [0]*self.size
+
+        for row in range(self.size):
+            for col in range(self.size):
+                if BoardArray[row][col] != 0:
+                    self.mark(row, col, BoardArray[row][col])
+
+    def square(self, row, col):
+        """Returns the index of the square holding the cell"""
+        return self.box[row*self.size+col]
+
+    def candidates(self, row, col):
+        """Returns the mask of values that can still be placed at the cell"""
+        return self.full & ~(self.rowmask[row] | self.colmask[col]
+            | self.sqrmask[self.square(row, col)])
+
+    def mark(self, row, col, num):
+        """Marks num as used in the row, column and square of the cell"""
+        bit = 1 << (num-1)
+        self.rowmask[row] |= bit
+        self.colmask[col] |= bit
+        self.sqrmask[self.square(row, col)] |= bit
+
+    def unmark(self, row, col, num):
+        """Clears num from the row, column and square of the cell"""
+        bit = ~(1 << (num-1))
+        self.rowmask[row] &= bit
+        self.colmask[col] &= bit
+        self.sqrmask[self.square(row, col)] &= bit
+
+def mask_values(mask):
+    """Returns the values held in a candidate mask in ascending order"""
+    values = []
+    while mask:
+        bit = mask & -mask
+        values.append(bit.bit_length())
+        mask ^= bit
+    return values
+
+def empty_units(empty, subsquare):
+    """Returns the indexes of the empty cells held by every row, column and
+    square as three lists indexed by unit"""
+    size = subsquare*subsquare
+    box = get_geometry(size).box
+    rows = [[] for i in range(size)]
+    cols = [[] for i in range(size)]
+    squares = [[] for i in range(size)]
+    for i in range(len(empty)):
+        row = empty[i][0]
+        col = empty[i][1]
+        rows[row].append(i)
+        cols[col].append(i)
+        squares[box[row*size+col]].append(i)
+    return rows, cols, squares
+
+def empty_peers(empty, subsquare):
+    """Returns for every cell of the empty list the indexes of the other empty
+    cells that share its row, column or square"""
+    size = subsquare*subsquare
+    geometry = get_geometry(size)
+    position = {}
+    for i in range(len(empty)):
+        position[empty[i][0]*size + empty[i][1]] = i
 
-            #success
-            if forward_check(initial_board, empty, visited, rowmap, colmap, sqrmap, index+1, MRV, Degree, LCV) == True:
-                return True
-            else:
-                #fail -> unmark the map
-                rowmap[row][bestValue-1] = 0
-                colmap[col][bestValue-1] = 0
-                sqrmap[SquareRow*subsquare+SquareCol][bestValue-1] = 0
+    peers = []
+    for i in range(len(empty)):
+        cell = empty[i][0]*size + empty[i][1]
+        peers.append(sorted([position[peer] for peer in geometry.peers[cell]
+                             if peer in position]))
+    return peers
+
+class MRVQueue(object):
+    """Bucket queue of the unassigned empty cells keyed by their number of
+    remaining values. Assigning a cell only moves its peers between buckets,
+    so picking the next variable does not rescan the whole empty list."""
+
+    def __init__(self, state, empty, visited, peers = None):
+        """Places every unvisited cell in the bucket of its candidate count"""
+        if peers is None:
+            peers = empty_peers(empty, state.subsquare)
+        self.peers = peers
+        self.count = [0]*len(empty)
+        self.buckets = [set() for i in range(state.size+1)]
+        for i in range(len(empty)):
+            if visited[i] == 0:
+                self.count[i] = popcount(state.candidates(empty[i][0], empty[i][1]))
+                self.buckets[self.count[i]].add(i)
+
+    def minimum(self):
+        """Returns a cell with the fewest remaining values or -1 if none is left"""
+        for bucket in self.buckets:
+            if bucket:
+                return next(iter(bucket))
+        return -1
+
+    def remove(self, i):
+        """Takes the cell out of the queue once it is assigned"""
+        self.buckets[self.count[i]].discard(i)
+
+    def insert(self, i):
+        """Puts an unassigned cell back into its bucket"""
+        self.buckets[self.count[i]].add(i)
+
+    def shift(self, i, delta):
+        """Moves the cell to the bucket delta values away from its current one"""
+        self.buckets[self.count[i]].discard(i)
+        self.count[i] += delta
+        self.buckets[self.count[i]].add(i)
+
+#kinds of the entries kept on the ForwardChecker trail
+PRUNED = 0
+ASSIGNED = 1
+
+class ForwardChecker(object):
+    """Explicit candidate domains of the empty cells. Placing a value removes
+    it from the domains of the unassigned peers, then the propagators run to
+    a fixpoint. Every assignment and removal is kept on a trail so it can be
+    undone when the search backtracks."""
+
+    def __init__(self, initial_board, state, empty, visited, peers, queue = None,
+        propagators = (), stats = None):
+        """Starts every domain from the candidates left by the clues"""
+        if stats is None:
+            stats = SearchStats()
+        self.stats = stats
+        self.board = initial_board
+        self.state = state
+        self.empty = empty
+        self.visited = visited
+        self.peers = peers
+        self.queue = queue
+        self.propagators = list(propagators)
+        self.domains = [state.candidates(cell[0], cell[1]) for cell in empty]
+        self.trail = []
+
+        rows, cols, squares = empty_units(empty, state.subsquare)
+        self.units = []
+        for unit in range(state.size):
+            self.units.append((state.rowmask, unit, rows[unit]))
+            self.units.append((state.colmask, unit, cols[unit]))
+            self.units.append((state.sqrmask, unit, squares[unit]))
+
+        #cells whose domain shrank to a single value, used by propagate_naked_singles
+        self.singles = None
+        if propagate_naked_singles in self.propagators:
+            self.singles = [i for i in range(len(empty))
+                if visited[i] == 0 and is_single(self.domains[i])]
+
+    def remove(self, i, bit):
+        """Removes bit from the domain of cell i and returns False if the
+        domain is wiped out"""
+        domain = self.domains[i] ^ bit
+        self.domains[i] = domain
+        self.trail.append((PRUNED, i, bit))
+        self.stats.pruned += 1
+        if self.queue is not None:
+            self.queue.shift(i, -1)
+        if domain == 0:
+            return False
+        if self.singles is not None and is_single(domain):
+            self.singles.append(i)
+        return True
 
+    def assign(self, index, num):
+        """Places num at the empty cell index and removes it from the domains
+        of the unassigned peers. Returns False as soon as one is wiped out"""
+        row = self.empty[index][0]
+        col = self.empty[index][1]
+        self.visited[index] = 1
+        if self.queue is not None:
+            self.queue.remove(index)
+        self.board.set_value(row, col, num)
+        self.state.mark(row, col, num)
+        self.trail.append((ASSIGNED, index, num))
+
+        bit = 1 << (num-1)
+        domains = self.domains
+        visited = self.visited
+        for i in self.peers[index]:
+            if visited[i] == 0 and domains[i] & bit:
+                if self.remove(i, bit) == False:
+                    return False
+        return True
+
+    def propagate(self):
+        """Runs the propagators until none of them changes a domain. Returns
+        False when one of them finds a contradiction"""
+        while True:
+            mark = len(self.trail)
+            for propagator in self.propagators:
+                if propagator(self) == False:
+                    return False
+            if len(self.trail) == mark:
+                return True
 
+    def undo(self, mark):
+        """Reverts every assignment and removal made since the trail had
+        length mark"""
+        domains = self.domains
+        trail = self.trail
+        while len(trail) > mark:
+            kind, i, value = trail.pop()
+            if kind == PRUNED:
+                domains[i] |= value
+                if self.queue is not None:
+                    self.queue.shift(i, 1)
+            else:
+                self.state.unmark(self.empty[i][0], self.empty[i][1], value)
+                self.visited[i] = 0
+                if self.queue is not None:
+                    self.queue.insert(i)
+        if self.singles is not None:
+            del self.singles[:]
+
+def is_single(mask):
+    """Returns True if exactly one bit of mask is set"""
+    return mask != 0 and mask & (mask-1) == 0
+
+def propagate_naked_singles(checker):
+    """Assigns every cell whose domain holds a single value"""
+    singles = checker.singles
+    while singles:
+        i = singles.pop()
+        if checker.visited[i] == 0:
+            checker.stats.propagated += 1
+            if checker.assign(i, checker.domains[i].bit_length()) == False:
+                return False
+    return True
 
-    visited[targetIndex] = 0
+def propagate_hidden_singles(checker):
+    """Assigns a value to the only cell of a row, column or square that can
+    still hold it. Returns False if a missing value has no cell left"""
+    domains = checker.domains
+    visited = checker.visited
+    full = checker.state.full
+    for masks, unit, cells in checker.units:
+        #values seen in at least one and in at least two domains of the unit
+        once = 0
+        twice = 0
+        for i in cells:
+            if visited[i] == 0:
+                twice |= once & domains[i]
+                once |= domains[i]
+        missing = full & ~masks[unit]
+        if missing & ~once:
+            return False
+        hidden = missing & ~twice
+        while hidden:
+            bit = hidden & -hidden
+            hidden ^= bit
+            if masks[unit] & bit:
+                continue
+            for i in cells:
+                if visited[i] == 0 and domains[i] & bit:
+                    checker.stats.propagated += 1
+                    if checker.assign(i, bit.bit_length()) == False:
+                        return False
+                    break
+            else:
+                return False
+    return True
 
-    return False
+def propagate_AC3(checker):
+    """Makes every pair of peers arc consistent under the all-different
+    constraints: a value is removed from a cell when a peer can hold nothing
+    else. Returns False if a domain is wiped out"""
+    domains = checker.domains
+    visited = checker.visited
+    worklist = [i for i in range(len(domains))
+        if visited[i] == 0 and is_single(domains[i])]
+    while worklist:
+        j = worklist.pop()
+        if visited[j] == 1:
+            continue
+        bit = domains[j]
+        for i in checker.peers[j]:
+            if visited[i] == 0 and domains[i] & bit:
+                if checker.remove(i, bit) == False:
+                    return False
+                if is_single(domains[i]):
+                    worklist.append(i)
+    return True
 
-def backtrack(initial_board, empty, visited, rowmap, colmap, sqrmap, index, MRV, Degree, LCV):
-    """Backtrack recursively searches the right value to fill the board
-    and return True if a solution is found otherwise return False"""
-    BoardArray = initial_board.CurrentGameBoard
-    size = initial_board.BoardSize
-    subsquare = int(math.sqrt(initial_board.BoardSize))
+def select_cell(state, empty, visited, index, MRV = False, Degree = False, queue = None):
+    """Returns the index in empty of the next cell for the bitmask engine, or
+    -1 when every cell has been assigned. Without MRV or Degree this is the
+    first unassigned cell from index on"""
 
     if MRV == True:
-        #compute the variable with the minimum remaining values
-        minValue = 1000
-        num_empty = 0
-
-        for i in range(len(empty)):
-            cell = empty[i]
-            tr = cell[0]
-            tc = cell[1]
-            if visited[i] == 0:
-                num_empty = num_empty + 1
-                Squaretr = tr // subsquare
-                Squaretc = tc // subsquare
-                temp = 0
-                for j in range(size):
-                    if rowmap[tr][j] == 0 and colmap[tc][j] == 0 and sqrmap[Squaretr*subsquare+Squaretc][j] == 0:
-                        temp = temp + 1
-                if temp < minValue:
-                    minValue = temp
-                    targetIndex = i
+        #the variable with the minimum remaining values heads the queue
+        return queue.minimum()
     elif Degree == True:
         #compute the variable invloved with the largest constraint on unassigned variables
+        full = state.full
         maxValue = -1
-        num_empty = 0
-
+        targetIndex = -1
         for i in range(len(empty)):
-            cell = empty[i]
-            tr = cell[0]
-            tc = cell[1]
             if visited[i] == 0:
-                num_empty = num_empty + 1
-                Squaretr = tr // subsquare
-                Squaretc = tc // subsquare
-                temp = 0
-                for j in range(size):
-                    if rowmap[tr][j] == 0:
-                        temp = temp + 1
-                    if colmap[tc][j] == 0:
-                        temp = temp + 1
-                    if sqrmap[Squaretr*subsquare+Squaretc][j] == 0:
-                        temp = temp + 1
+                tr = empty[i][0]
+                tc = empty[i][1]
+                temp = (popcount(full & ~state.rowmask[tr])
+                    + popcount(full & ~state.colmask[tc])
+                    + popcount(full & ~state.sqrmask[state.square(tr, tc)]))
                 if temp > maxValue:
                     maxValue = temp
-                    targetIndex= i
+                    targetIndex = i
+        return targetIndex
     else:
-        targetIndex = index
-
-    if MRV == False and Degree == False:
+        #skip the cells already assigned by propagation
+        while index < len(empty) and visited[index] == 1:
+            index = index + 1
         if index == len(empty):
-            return True
+            return -1
+        return index
+
+def bitmask_values(state, empty, visited, targetIndex, LCV = False, checker = None,
+    peers = None, rng = None):
+    """Returns the values left for the cell. With LCV they are sorted by how
+    many unassigned peers (from the peers table) could still hold them. With a
+    random.Random they come in random order, LCV then only breaking its ties
+    at random"""
+    row = empty[targetIndex][0]
+    col = empty[targetIndex][1]
+    if checker is not None:
+        values = mask_values(checker.domains[targetIndex])
     else:
-        if num_empty == 0:
-            return True
-
-    currentCell = empty[targetIndex]
-    row = currentCell[0]
-    col = currentCell[1]
-    SquareRow = row // subsquare
-    SquareCol = col // subsquare
+        values = mask_values(state.candidates(row, col))
+    if rng is not None:
+        rng.shuffle(values)
 
-    visited[targetIndex] = 1
-    if LCV == False:
-        for num in range(1,initial_board.BoardSize+1):
-            if is_valid(initial_board, row, col, num):
-                initial_board.set_value(row, col, num)
-                if backtrack(initial_board, empty, visited, rowmap, colmap, sqrmap, index+1, MRV, Degree, LCV) == True:
-                    return True
+    if LCV == True and len(values) > 1:
+        impact = [0]*(state.size+1)
+        for i in peers[targetIndex]:
+            if visited[i] == 0:
+                if checker is not None:
+                    remaining = checker.domains[i]
                 else:
-                    initial_board.set_value(row, col, 0)
-    elif LCV == True:
-        used_value = [0]*size
-        for j in range(size):
-            if rowmap[row][j] == 1:
-                used_value[j] = 1
-            if colmap[col][j] == 1:
-                used_value[j] = 1
-            if sqrmap[SquareRow*subsquare+SquareCol][j] == 1:
-                used_value[j] = 1
-        while sum(used_value) != size:
-            minSum = 1000
-            temp_sum = 0
-            bestValue = 1
-            for num in range(1,initial_board.BoardSize+1):
-                if rowmap[row][num-1] == 0 and colmap[col][num-1] == 0 and sqrmap[SquareRow*subsquare+SquareCol][num-1] == 0:
-                    #haven't tried this value yet
-                    if used_value[num-1] == 0:
-                        #compute its impact on other unassigned
-                        for i in range(len(empty)):
-                            if visited[i] == 0:
-                                temprow = empty[i][0]
-                                tempcol = empty[i][1]
-                                temprowsub = temprow // subsquare
-                                tempcolsub = tempcol // subsquare
-                                if temprow == row:
-                                    if colmap[tempcol][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                    if sqrmap[temprowsub*subsquare+tempcolsub][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                if tempcol == col:
-                                    if rowmap[temprow][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                    if sqrmap[temprowsub*subsquare+tempcolsub][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                if temprowsub*subsquare+tempcolsub == SquareRow*subsquare+SquareCol:
-                                    if colmap[tempcol][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                                    if rowmap[temprow][num-1] == 0:
-                                        temp_sum = temp_sum + 1
-                        if temp_sum < minSum:
-                            minSum = temp_sum
-                            bestValue = num
-            #first try the best value
-            initial_board.set_value(row, col, bestValue)
-            used_value[bestValue-1] = 1
-
-            #success
-            if backtrack(initial_board, empty,visited, rowmap, colmap, sqrmap, index+1, MRV, Degree, LCV) == True:
-                return True
+                    remaining = state.candidates(empty[i][0], empty[i][1])
+                for num in values:
+                    if remaining >> (num-1) & 1:
+                        impact[num] = impact[num] + 1
+        values.sort(key = lambda num: impact[num])
+    return values
+
+def bitmask_search(initial_board, state, empty, visited, index, MRV = False,
+    Degree = False, LCV = False, queue = None, checker = None, stats = None,
+    peers = None, rng = None):
+    """bitmask_search searches the right value to fill the board using the
+    bitmask constraint state and return True if a solution is found otherwise
+    return False."""
+    return next(bitmask_solutions(initial_board, state, empty, visited, index, MRV,
+        Degree, LCV, queue, checker, stats, peers, rng), False)
+
+def bitmask_solutions(initial_board, state, empty, visited, index, MRV = False,
+    Degree = False, LCV = False, queue = None, checker = None, stats = None,
+    peers = None, rng = None):
+    """Generates True every time the board holds a solution found with the
+    bitmask constraint state, searching on past it when resumed. With MRV
+    the cells are picked from an MRVQueue that is updated incrementally as
+    values are placed. With a ForwardChecker the values are drawn from
+    explicit domains and a branch is abandoned as soon as a peer's domain
+    becomes empty. The search keeps an explicit stack of [cell, values,
+    position, undo] frames instead of recursing, and updates the counters
+    and timers of stats as it goes."""
+
+    if stats is None:
+        stats = SearchStats()
+    if peers is None and (MRV == True or LCV == True):
+        peers = empty_peers(empty, state.subsquare)
+    if MRV == True and queue is None:
+        queue = MRVQueue(state, empty, visited, peers)
+    timer = time.time
+    stack = []
+
+    while True:
+        stats.check_limit()
+        start = timer()
+        if len(stack) > 0:
+            index = stack[-1][0] + 1
+        targetIndex = select_cell(state, empty, visited, index, MRV, Degree, queue)
+        stats.select_time += timer() - start
+        if targetIndex == -1:
+            #a solution: resuming moves on to the next value of the last cell
+            yield True
+        else:
+            start = timer()
+            values = bitmask_values(state, empty, visited, targetIndex, LCV, checker, peers, rng)
+            stats.order_time += timer() - start
+            stats.candidate_checks += len(values)
+            if checker is None:
+                visited[targetIndex] = 1
+                if MRV == True:
+                    queue.remove(targetIndex)
+            stack.append([targetIndex, values, 0, None])
+            stats.max_depth = max(stats.max_depth, len(stack))
+
+        #move to the next value, dropping the frames that ran out of values
+        while len(stack) > 0:
+            frame = stack[-1]
+            targetIndex = frame[0]
+            values = frame[1]
+            pos = frame[2]
+            undo = frame[3]
+            row = empty[targetIndex][0]
+            col = empty[targetIndex][1]
+            found = False
+            start = timer()
+
+            if checker is not None:
+                if pos > 0:
+                    #fail -> undo the assignment and its propagation
+                    stats.backtracks += 1
+                    checker.undo(undo)
+                while found == False and pos < len(values):
+                    #forward check the peers and propagate, the queue follows the domains
+                    stats.nodes += 1
+                    undo = len(checker.trail)
+                    if checker.assign(targetIndex, values[pos]) and checker.propagate():
+                        found = True
+                    else:
+                        stats.backtracks += 1
+                        checker.undo(undo)
+                    pos = pos + 1
             else:
-                initial_board.set_value(row, col, 0)
-
-
-    return False
-
-
-def solve(initial_board, forward_checking = False, MRV = False, Degree = False,
-    LCV = False):
-    """Takes an initial SudokuBoard and solves it using back tracking, and zero
-    or more of the heuristics and constraint propagation methods (determined by
-    arguments). Returns the resulting board solution. """
-
+                if pos > 0:
+                    #fail -> unmark the state
+                    stats.backtracks += 1
+                    state.unmark(row, col, values[pos-1])
+                    if MRV == True:
+                        for i in undo:
+                            queue.shift(i, 1)
+                if pos < len(values):
+                    num = values[pos]
+                    pos = pos + 1
+                    stats.nodes += 1
+                    initial_board.set_value(row, col, num)
+                    if MRV == True:
+                        #the unassigned peers that lose num as a candidate
+                        bit = 1 << (num-1)
+                        undo = []
+                        for i in queue.peers[targetIndex]:
+                            if visited[i] == 0 and state.candidates(empty[i][0], empty[i][1]) & bit:
+                                undo.append(i)
+                        for i in undo:
+                            queue.shift(i, -1)
+                    state.mark(row, col, num)
+                    found = True
+
+            stats.assign_time += timer() - start
+            if found == True:
+                frame[2] = pos
+                frame[3] = undo
+                break
+
+            if checker is None:
+                if MRV == True:
+                    queue.insert(targetIndex)
+                visited[targetIndex] = 0
+            stack.pop()
+
+        if len(stack) == 0:
+            return
+
+class NogoodStore(object):
+    """Bounded store of learned nogoods: sets of (cell, value bit) assignments
+    that cannot all hold in a solution. Only nogoods of at most size
+    assignments are kept and the oldest one is dropped past limit."""
+
+    def __init__(self, size = 4, limit = 10000):
+        self.size = size
+        self.limit = limit
+        self.entries = OrderedDict()
+        self.index = {}
+
+    def add(self, nogood):
+        """Stores a frozenset of assignments unless it is too large or known"""
+        if len(nogood) > self.size or nogood in self.entries:
+            return False
+        self.entries[nogood] = None
+        for literal in nogood:
+            self.index.setdefault(literal, []).append(nogood)
+        if len(self.entries) > self.limit:
+            oldest = self.entries.popitem(last = False)[0]
+            for literal in oldest:
+                self.index[literal].remove(oldest)
+        return True
 
+    def violated(self, cell, bit, value):
+        """Returns the other cells of a nogood that assigning bit to cell would
+        complete under the current values, or None"""
+        for nogood in self.index.get((cell, bit), ()):
+            if all([value[other] == otherbit for other, otherbit in nogood if other != cell]):
+                return [other for other, otherbit in nogood if other != cell]
+        return None
+
+def backjump_solutions(initial_board, state, empty, peers, MRV = False, nogoods = None,
+    stats = None):
+    """Generates True every time the board holds a solution found by forward
+    checking with conflict-directed backjumping, searching on past it when
+    resumed. Every cell remembers the depths whose assignments pruned its
+    domain, and every frame collects the depths behind the failures of its
+    values. When a cell runs out of values the search jumps straight back to
+    the deepest of them, skipping the levels that had no part in the conflict.
+    With a NogoodStore the small conflict sets are also learned and checked
+    before a value is placed. Frames are [cell, values left, value bit,
+    pruned cells, conflict depths]."""
+
+    if stats is None:
+        stats = SearchStats()
+    timer = time.time
+    count = len(empty)
+    domains = [state.candidates(row, col) for row, col in empty]
+    value = [0]*count
+    position = [0]*count
+    pruners = [[] for i in range(count)]
+    stack = []
+    learning = nogoods is not None
+    if 0 in domains:
+        return
+
+    while True:
+        stats.check_limit()
+        start = timer()
+        targetIndex = -1
+        fewest = state.size + 1
+        for i in range(count):
+            if value[i] == 0:
+                if MRV == False:
+                    targetIndex = i
+                    break
+                remaining = popcount(domains[i])
+                if remaining < fewest:
+                    fewest = remaining
+                    targetIndex = i
+        stats.select_time += timer() - start
+
+        if targetIndex == -1:
+            yield True
+            #resuming goes back one level at a time: the last cell now
+            #conflicts with every earlier one, and what is learned from
+            #exhausted branches no longer holds for every solution
+            learning = False
+            if len(stack) > 0:
+                stack[-1][4].update(range(len(stack)-1))
+        else:
+            position[targetIndex] = len(stack)
+            stack.append([targetIndex, domains[targetIndex], 0, [], set()])
+            stats.max_depth = max(stats.max_depth, len(stack))
+
+        while len(stack) > 0:
+            frame = stack[-1]
+            depth = len(stack) - 1
+            targetIndex = frame[0]
+            start = timer()
+            if frame[2] != 0:
+                #fail -> give back what the value pruned
+                stats.backtracks += 1
+                for i in frame[3]:
+                    domains[i] |= frame[2]
+                    pruners[i].pop()
+                frame[3] = []
+                frame[2] = 0
+                value[targetIndex] = 0
+
+            found = False
+            while frame[1] != 0:
+                bit = frame[1] & -frame[1]
+                frame[1] ^= bit
+                stats.nodes += 1
+                if nogoods is not None:
+                    others = nogoods.violated(targetIndex, bit, value)
+                    if others is not None:
+                        stats.nogood_prunes += 1
+                        frame[4].update([position[other] for other in others])
+                        continue
+
+                #forward check the unassigned peers
+                value[targetIndex] = bit
+                frame[2] = bit
+                wiped = -1
+                for i in peers[targetIndex]:
+                    if value[i] == 0 and domains[i] & bit:
+                        domains[i] ^= bit
+                        frame[3].append(i)
+                        pruners[i].append(depth)
+                        stats.pruned += 1
+                        if domains[i] == 0:
+                            wiped = i
+                            break
+                if wiped == -1:
+                    found = True
+                    break
+
+                #the wiped out peer lost its other values to these depths
+                frame[4].update([d for d in pruners[wiped] if d != depth])
+                for i in frame[3]:
+                    domains[i] |= bit
+                    pruners[i].pop()
+                frame[3] = []
+                frame[2] = 0
+                value[targetIndex] = 0
+            stats.assign_time += timer() - start
+
+            if found == True:
+                row = empty[targetIndex][0]
+                col = empty[targetIndex][1]
+                initial_board.set_value(row, col, mask_values(frame[2])[0])
+                break
+
+            #dead end -> jump back to the deepest depth in the conflict
+            conflicts = frame[4]
+            conflicts.update(pruners[targetIndex])
+            stack.pop()
+            if len(conflicts) == 0:
+                return
+            culprit = max(conflicts)
+            if learning == True and nogoods.add(frozenset([(stack[d][0], stack[d][2])
+                    for d in conflicts])):
+                stats.nogoods_learned += 1
+            if culprit < depth - 1:
+                stats.backjumps += 1
+                stats.levels_skipped += depth - 1 - culprit
+            while len(stack) > culprit + 1:
+                skipped = stack.pop()
+                for i in skipped[3]:
+                    domains[i] |= skipped[2]
+                    pruners[i].pop()
+                value[skipped[0]] = 0
+            conflicts.discard(culprit)
+            stack[culprit][4].update(conflicts)
+
+        if len(stack) == 0:
+            return
+
+class DancingLinks(object):
+    """Exact cover encoding of a board solved with Knuth's Algorithm X. Each of
+    the size**3 rows places one value in one cell and covers four of the
+    4*size**2 columns: the cell, the value in its row, the value in its column
+    and the value in its square. The nodes live in parallel lists, node 0 is
+    the root and nodes 1..4*size**2 are the column headers."""
+
+    def __init__(self, sudoku_board):
+        """Builds the matrix and selects the rows of the clues"""
+        self.board = sudoku_board
+        size = sudoku_board.BoardSize
+        box = get_geometry(size).box
+        area = size*size
+        columns = 4*area
+        self.size = size
+
+        #headers: left/right form the column list, up/down each column
+        self.L = [i-1 for i in range(columns+1)]
+        self.R = [i+1 for i in range(columns+1)]
+        self.L[0] = columns
+        self.R[columns] = 0
+        self.U = list(range(columns+1))
+        self.D = list(range(columns+1))
+        self.C = list(range(columns+1))
+        self.S = [0]*(columns+1)
+        self.rowof = [-1]*(columns+1)
+        self.rownode = []
+
+        for row in range(size):
+            for col in range(size):
+                square = box[row*size+col]
+                for num in range(size):
+                    self.add_row(len(self.rownode), (1 + row*size + col,
+                        1 + area + row*size + num,
+                        1 + 2*area + col*size + num,
+                        1 + 3*area + square*size + num))
+
+        #the clues are part of every solution
+        self.consistent = True
+        covered = set()
+        BoardArray = sudoku_board.CurrentGameBoard
+        for row in range(size):
+            for col in range(size):
+                if BoardArray[row][col] != 0:
+                    node = self.rownode[(row*size + col)*size + BoardArray[row][col]-1]
+                    j = node
+                    while True:
+                        if self.C[j] in covered:
+                            self.consistent = False
+                            return
+                        covered.add(self.C[j])
+                        self.cover(self.C[j])
+                        j = self.R[j]
+                        if j == node:
+                            break
+
+    def add_row(self, rowid, cols):
+        """Appends a row with one node in each of the given columns"""
+        first = len(self.C)
+        for k in range(len(cols)):
+            col = cols[k]
+            node = first + k
+            self.L.append(first + (k-1) % len(cols))
+            self.R.append(first + (k+1) % len(cols))
+            self.U.append(self.U[col])
+            self.D.append(col)
+            self.D[self.U[col]] = node
+            self.U[col] = node
+            self.C.append(col)
+            self.S.append(0)
+            self.rowof.append(rowid)
+            self.S[col] += 1
+        self.rownode.append(first)
+
+    def cover(self, c):
+        """Removes column c and every row that has a node in it"""
+        L = self.L; R = self.R; U = self.U; D = self.D; C = self.C; S = self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        """Puts back column c and its rows in the reverse order of cover"""
+        L = self.L; R = self.R; U = self.U; D = self.D; C = self.C; S = self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def choose_column(self):
+        """Returns the uncovered column with the fewest rows left"""
+        R = self.R; S = self.S
+        best = R[0]
+        c = R[best]
+        while c != 0 and S[best] > 1:
+            if S[c] < S[best]:
+                best = c
+            c = R[c]
+        return best
+
+    def select(self, r):
+        """Covers the columns of every other node in row r"""
+        j = self.R[r]
+        while j != r:
+            self.cover(self.C[j])
+            j = self.R[j]
+
+    def unselect(self, r):
+        """Uncovers the other columns of row r in reverse order"""
+        j = self.L[r]
+        while j != r:
+            self.uncover(self.C[j])
+            j = self.L[j]
+
+    def search(self, stats = None):
+        """Searches for an exact cover and writes it on the board. Returns True
+        if a solution is found otherwise False."""
+        return next(self.solutions(stats), False)
+
+    def solutions(self, stats = None):
+        """Generates True every time an exact cover is written on the board,
+        searching on past it when resumed. The chosen rows are kept on an
+        explicit stack of [column, row] frames instead of recursing, and every
+        row selected is counted as a node in stats."""
+        if stats is None:
+            stats = SearchStats()
+        if self.consistent == False:
+            return
+        timer = time.time
+        stack = []
+
+        while True:
+            stats.check_limit()
+            if self.R[0] == 0:
+                size = self.size
+                for frame in stack:
+                    rowid = self.rowof[frame[1]]
+                    self.board.set_value(rowid // (size*size), (rowid // size) % size,
+                        rowid % size + 1)
+                #resuming moves on to the next row of the deepest column
+                yield True
+            else:
+                start = timer()
+                c = self.choose_column()
+                stats.select_time += timer() - start
+                if self.S[c] > 0:
+                    start = timer()
+                    stats.nodes += 1
+                    stats.candidate_checks += self.S[c]
+                    self.cover(c)
+                    stack.append([c, self.D[c]])
+                    self.select(self.D[c])
+                    stats.max_depth = max(stats.max_depth, len(stack))
+                    stats.assign_time += timer() - start
+                    continue
+
+            #fail -> move to the next row of the deepest column left
+            start = timer()
+            while len(stack) > 0:
+                frame = stack[-1]
+                c = frame[0]
+                stats.backtracks += 1
+                self.unselect(frame[1])
+                frame[1] = self.D[frame[1]]
+                if frame[1] != c:
+                    stats.nodes += 1
+                    self.select(frame[1])
+                    break
+                self.uncover(c)
+                stack.pop()
+            stats.assign_time += timer() - start
+
+            if len(stack) == 0:
+                return
+
+
+def solutions(initial_board, forward_checking = False, MRV = False, Degree = False,
+    LCV = False, bitmask = False, naked_singles = False, hidden_singles = False,
+    AC3 = False, dancing_links = False, backjumping = False, nogoods = False, stats = None,
+    seed = None):
+    """Generates the board every time it holds a solution, searching with the
+    engine and heuristics chosen as in solve. The board is filled in place, so
+    copy it to keep a solution; the search goes on past it when the next one
+    is asked for. A board whose clues conflict has no solution to generate."""
+
+    if consistent_clues(initial_board) == False:
+        return
     BoardArray = initial_board.CurrentGameBoard
     size = initial_board.BoardSize
 
@@ -642,6 +1532,7 @@ def solve(initial_board, forward_checking = False, MRV = False, Degree = False,
     colmap = []
     sqrmap = []
     subsquare = int(math.sqrt(initial_board.BoardSize))
+    box = get_geometry(size).box
 
     #construct the map that marks the valid input
     for i in range(size):
@@ -653,22 +1544,67 @@ def solve(initial_board, forward_checking = False, MRV = False, Degree = False,
     for row in range(size):
         for col in range(size):
             current = BoardArray[row][col]
-            SquareRow = row // subsquare
-            SquareCol = col // subsquare
             if current == 0:
                 empty.append((row,col))
             else:
                 rowmap[row][current-1] = 1
                 colmap[col][current-1] = 1
-                sqrmap[SquareRow*subsquare+SquareCol][current-1] = 1
-
-
-
-    start_time = time.time()
+                sqrmap[box[row*size+col]][current-1] = 1
+
+    rng = None
+    if seed is not None:
+        rng = random.Random(seed)
+        if MRV == True or Degree == True:
+            #numbering the cells in random order breaks the ties at random, the
+            #plain order is left alone as filling row by row prunes far better
+            rng.shuffle(empty)
+
+    if stats is None:
+        stats = SearchStats()
     visited = [0]*len(empty)
 
-    if forward_checking == True:
-        forward_check(initial_board, empty, visited, rowmap, colmap, sqrmap, 0, MRV, Degree, LCV)
+    propagators = []
+    if naked_singles == True:
+        propagators.append(propagate_naked_singles)
+    if hidden_singles == True:
+        propagators.append(propagate_hidden_singles)
+    if AC3 == True:
+        propagators.append(propagate_AC3)
+
+    if dancing_links == True:
+        found = DancingLinks(initial_board).solutions(stats)
+    elif backjumping == True or nogoods == True:
+        store = None
+        if nogoods == True:
+            store = NogoodStore()
+        found = backjump_solutions(initial_board, BitmaskState(initial_board), empty,
+            empty_peers(empty, subsquare), MRV, store, stats)
+    elif bitmask == True or len(propagators) > 0:
+        state = BitmaskState(initial_board)
+        queue = None
+        checker = None
+        peers = None
+        if MRV == True or LCV == True or forward_checking == True or len(propagators) > 0:
+            peers = empty_peers(empty, subsquare)
+        if MRV == True:
+            queue = MRVQueue(state, empty, visited, peers)
+        if forward_checking == True or len(propagators) > 0:
+            checker = ForwardChecker(initial_board, state, empty, visited, peers, queue,
+                propagators, stats)
+            found = []
+            #propagate the clues before branching
+            if 0 not in checker.domains and checker.propagate():
+                found = bitmask_solutions(initial_board, state, empty, visited, 0, MRV, Degree,
+                    LCV, queue, checker, stats, peers, rng)
+        else:
+            found = bitmask_solutions(initial_board, state, empty, visited, 0, MRV, Degree, LCV,
+                queue, None, stats, peers, rng)
+    elif forward_checking == True:
+        peers = None
+        if LCV == True:
+            peers = empty_peers(empty, subsquare)
+        found = forward_check_solutions(initial_board, empty, visited, rowmap, colmap, sqrmap, 0,
+            MRV, Degree, LCV, stats, peers)
     # elif MRV == True:
     #      MRV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap)
     # elif Degree == True:
@@ -676,12 +1612,165 @@ def solve(initial_board, forward_checking = False, MRV = False, Degree = False,
     # elif LCV == True:
     #     LCV_checking(initial_board, empty, visited, rowmap, colmap, sqrmap, 0)
     else:
-        backtrack(initial_board, empty, visited, rowmap, colmap, sqrmap, 0, MRV, Degree, LCV)
+        peers = None
+        if LCV == True:
+            peers = empty_peers(empty, subsquare)
+        found = backtrack_solutions(initial_board, empty, visited, rowmap, colmap, sqrmap, 0,
+            MRV, Degree, LCV, stats, peers)
+
+    for solved in found:
+        yield initial_board
+
+def solve(initial_board, forward_checking = False, MRV = False, Degree = False,
+    LCV = False, bitmask = False, naked_singles = False, hidden_singles = False,
+    AC3 = False, dancing_links = False, backjumping = False, nogoods = False,
+    stats = None, verbose = True, return_stats = False, cache = None, time_limit = None,
+    node_limit = None, cancel = None, seed = None):
+    """Takes an initial SudokuBoard and solves it using back tracking, and zero
+    or more of the heuristics and constraint propagation methods (determined by
+    arguments). Returns the resulting board solution. When bitmask is set the
+    search keeps its row, column and square constraints as integer bitmasks,
+    and forward_checking then prunes explicit per-cell domains. naked_singles,
+    hidden_singles and AC3 propagate the domains to a fixpoint before the
+    search and after every assignment, and imply the bitmask engine.
+    dancing_links solves the board as an exact cover problem instead.
+    backjumping forward checks bitmask domains and jumps back to the cause of
+    a dead end, nogoods also learns small conflict sets; both only follow MRV
+    among the other options. The outcome, counters and timers of the search
+    are recorded in stats (a new SearchStats unless one is given), and solve
+    returns (board, stats) when return_stats is set. The board is only
+    printed when verbose. A cache (see SudokuCache.SolutionCache) answers
+    puzzles equivalent to ones solved before without searching and remembers
+    the new solutions. The search gives up after time_limit seconds, after
+    node_limit nodes or once the cancel Event is set; the board then keeps
+    only its clues and stats.status tells 'timeout', 'budget' or 'cancelled'
+    apart from 'solved' and 'unsolved'. A seed breaks the MRV and Degree ties
+    at random and shuffles the value order of the bitmask engine. """
+
+    if stats is None:
+        stats = SearchStats()
+    start_time = time.time()
+    if time_limit is not None:
+        stats.deadline = start_time + time_limit
+    if node_limit is not None:
+        stats.node_limit = node_limit
+    if cancel is not None:
+        stats.cancel = cancel
+
+    hit = False
+    if cache is not None:
+        key, transform, hit = cache.lookup(initial_board)
+
+    status = None
+    if hit == True:
+        solved = True
+    else:
+        snapshot = initial_board.snapshot()
+        try:
+            solved = next(solutions(initial_board, forward_checking, MRV, Degree, LCV, bitmask,
+                naked_singles, hidden_singles, AC3, dancing_links, backjumping, nogoods, stats,
+                seed), None) is not None
+        except SearchLimit as e:
+            initial_board.restore(snapshot)
+            solved = False
+            status = e.status
+
+    if cache is not None and hit == False and solved == True:
+        cache.store_solution(key, transform, initial_board)
 
     elapsed_time = time.time() - start_time;
-    print "The time used: "
-    print elapsed_time
-    initial_board.print_board()
+    stats.solved = solved
+    stats.status = status or ('solved' if solved == True else 'unsolved')
+    stats.elapsed = elapsed_time
+    if verbose == True:
+        print "The time used: "
+        print elapsed_time
+        initial_board.print_board()
+    if return_stats == True:
+        return initial_board, stats
+    return initial_board
+
+def count_solutions(initial_board, limit = None, stats = None, **options):
+    """Counts the solutions of the board, stopping once limit of them are found.
+    The engine and heuristics are chosen by the solve options. The board is
+    left holding its clues."""
+    snapshot = initial_board.snapshot()
+    count = 0
+    try:
+        for board in solutions(initial_board, stats = stats, **options):
+            count = count + 1
+            if limit is not None and count >= limit:
+                break
+    finally:
+        initial_board.restore(snapshot)
+    return count
+
+def is_unique(initial_board, stats = None, **options):
+    """Returns True when the board has exactly one solution. Without options
+    the search propagates naked and hidden singles and branches on MRV, which
+    cuts the tree hardest once the second solution has to be ruled out."""
+    if len(options) == 0:
+        options = dict(naked_singles = True, hidden_singles = True, MRV = True)
+    return count_solutions(initial_board, 2, stats, **options) == 1
+
+def luby(i):
+    """Returns term i, counted from 1, of the Luby sequence 1 1 2 1 1 2 4 1 1 2 ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k = k + 1
+    if (1 << k) - 1 == i:
+        return 1 << (k-1)
+    return luby(i - (1 << (k-1)) + 1)
+
+def seed_randomizes(options):
+    """Returns True when a seed changes the search chosen by the solve()
+    options: dancing_links ignores it, the other engines follow it through
+    MRV or Degree ties and the bitmask engine also through its value order"""
+    get = options.get
+    if get('dancing_links'):
+        return False
+    if get('MRV') or get('Degree'):
+        return True
+    if get('backjumping') or get('nogoods'):
+        return False
+    return bool(get('bitmask') or get('naked_singles') or get('hidden_singles') or get('AC3'))
+
+def solve_restarts(initial_board, restart_nodes = 100, seed = None, stats = None,
+    time_limit = None, node_limit = None, cancel = None, **options):
+    """Solves the board with a series of randomized searches using the solve()
+    options. Run i gets a new seed and is started over from the clues once it
+    has placed restart_nodes times luby(i) values, so an unlucky early choice
+    costs little while the longer runs keep the search complete. The limits
+    bound the whole series, stats adds up its runs and stats.restarts counts
+    the runs abandoned. Returns the board. Raises ValueError for options the
+    seed has no effect on, as every run would repeat the first one."""
+    if seed_randomizes(options) == False:
+        raise ValueError('restarts need a search the seed randomizes: use MRV, Degree '
+            'or the bitmask engine, and not dancing_links')
+    if stats is None:
+        stats = SearchStats()
+    start_time = time.time()
+    rng = random.Random(seed)
+    run = 0
+    while True:
+        run = run + 1
+        budget = restart_nodes*luby(run)
+        if node_limit is not None:
+            budget = min(budget, node_limit - stats.nodes)
+        remaining = None
+        if time_limit is not None:
+            remaining = max(0, start_time + time_limit - time.time())
+        run_stats = SearchStats()
+        solve(initial_board, stats = run_stats, verbose = False, time_limit = remaining,
+            node_limit = budget, cancel = cancel, seed = rng.getrandbits(32), **options)
+        stats.add(run_stats)
+        if run_stats.status != 'budget' or (node_limit is not None and stats.nodes >= node_limit):
+            break
+        stats.restarts += 1
+
+    stats.solved = run_stats.solved
+    stats.status = run_stats.status
+    stats.elapsed = time.time() - start_time
     return initial_board
 
 
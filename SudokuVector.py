@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+"""Solves many puzzles of one size together. The candidates of a batch of
+boards are held in a (count, size, size, size) boolean array, indexed by
+board, row, column and digit, and naked and hidden singles are applied to
+the whole batch with NumPy array operations until nothing changes. Only the
+boards the singles do not finish go on to the scalar search, one by one.
+Without NumPy every board goes to the scalar search.
+
+    python SudokuVector.py --mrv --naked-singles input_puzzles/more/9x9 puzzles.pack
+"""
+import sys, math, time, argparse, collections
+
+from SudokuStarter import SudokuBoard
+from SudokuBatch import SOLVE_FLAGS, solve_board, write_records
+from SudokuCheck import stack_boards
+from SudokuPack import PuzzlePack, load_puzzles
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#propagate() status of a board
+OPEN, SOLVED, CONTRADICTION = 0, 1, 2
+
+def candidate_array(boards, size):
+    """Returns the (count, size, size, size) candidates of the boards: only
+    the clue for a given cell, every digit for an empty one"""
+    stack = stack_boards(boards, size).reshape(len(boards), size, size)
+    digits = numpy.arange(1, size+1, dtype = stack.dtype)
+    return numpy.where((stack > 0)[..., None], stack[..., None] == digits, True)
+
+def board_values(cand):
+    """Returns the (count, size*size) cell values of candidate arrays, 0 where
+    a cell still has more than one candidate"""
+    count, size = cand.shape[0], cand.shape[1]
+    flat = cand.reshape(count, size*size, size)
+    values = flat.argmax(axis = 2) + 1
+    values[cell_counts(cand).reshape(count, size*size) != 1] = 0
+    return values.astype(numpy.uint8)
+
+def total(slabs):
+    """Returns the elementwise sum of equally shaped arrays. Adding whole
+    slabs is much faster than a NumPy reduction over a short axis."""
+    result = slabs[0].astype(numpy.uint8)
+    for slab in slabs[1:]:
+        result += slab
+    return result
+
+def cell_counts(cand):
+    """Returns the (count, size, size) number of candidates of every cell"""
+    cand = cand.view(numpy.uint8)
+    return total([cand[..., digit] for digit in range(cand.shape[3])])
+
+def unit_counts(cand, subsquare):
+    """Returns how many cells of every row, column and square of a (count,
+    size, size, size) array hold each digit, as (count, size, size) row and
+    column arrays and a (count, subsquare, subsquare, size) square array"""
+    count, size = cand.shape[0], cand.shape[1]
+    cand = cand.view(numpy.uint8)
+    rows = total([cand[:, :, col] for col in range(size)])
+    cols = total([cand[:, row] for row in range(size)])
+    blocks = cand.reshape(count, subsquare, subsquare, subsquare, subsquare, size)
+    squares = total([blocks[:, :, row, :, col] for row in range(subsquare)
+        for col in range(subsquare)])
+    return rows, cols, squares
+
+def spread(rows, cols, squares):
+    """Returns the (count, size, size, size) array that is True for a cell and
+    digit when it is True for the row, column or square of the cell, the
+    reverse of unit_counts"""
+    count, subsquare, size = squares.shape[0], squares.shape[1], squares.shape[3]
+    cells = (rows[:, :, None, :] | cols[:, None, :, :]).reshape(count,
+        subsquare, subsquare, subsquare, subsquare, size)
+    cells |= squares[:, :, None, :, None, :]
+    return cells.reshape(count, size, size, size)
+
+def any_unit(units, test):
+    """Returns for every board whether test holds for a digit of one of the
+    units returned by unit_counts"""
+    count = len(units[0])
+    found = numpy.zeros(count, dtype = bool)
+    for kind in units:
+        found |= test(kind).reshape(count, -1).any(axis = 1)
+    return found
+
+def propagate(cand):
+    """Applies naked and hidden singles to a (count, size, size, size)
+    candidate array in place until no board changes any more, and returns
+    the OPEN, SOLVED or CONTRADICTION status of every board"""
+    count, size = cand.shape[0], cand.shape[1]
+    subsquare = int(math.sqrt(size))
+    status = numpy.zeros(count, dtype = numpy.int8)
+    active = numpy.arange(count)
+
+    while len(active) > 0:
+        board = cand[active]
+        counts = cell_counts(board)
+        before = counts.sum(axis = (1, 2))
+
+        #naked singles: a placed digit leaves the other cells of its units
+        single = board & (counts == 1)[..., None]
+        placed = unit_counts(single, subsquare)
+        board &= ~spread(*[kind > 0 for kind in placed]) | single
+
+        #hidden singles: a digit with one place left in a unit goes there
+        places = unit_counts(board, subsquare)
+        forced = board & spread(*[kind == 1 for kind in places])
+        board = numpy.where(forced.any(axis = 3)[..., None], forced, board)
+
+        counts = cell_counts(board)
+        broken = ((counts == 0).any(axis = (1, 2))
+            | (cell_counts(forced) > 1).any(axis = (1, 2))
+            | any_unit(placed, lambda kind: kind > 1) | any_unit(places, lambda kind: kind == 0))
+        done = ~broken & (counts == 1).all(axis = (1, 2))
+        if done.any():
+            #singles found in this pass were not checked against each other yet
+            filled = numpy.flatnonzero(done)
+            bad = any_unit(unit_counts(board[filled], subsquare), lambda kind: kind != 1)
+            broken[filled[bad]] = True
+            done &= ~broken
+
+        cand[active] = board
+        status[active[broken]] = CONTRADICTION
+        status[active[done]] = SOLVED
+        active = active[~broken & ~done & (counts.sum(axis = (1, 2)) < before)]
+    return status
+
+def solve_boards(boards, options = None, timeout = None, batch_size = 1024):
+    """Generates a result record, as written by SudokuBatch, for every board
+    in order. Boards of one size are propagated batch_size at a time and
+    those left open are finished by solve() with the given options. The
+    elapsed time of a batch is shared out evenly between its boards."""
+    options = options or {}
+    if numpy is None:
+        for board in boards:
+            yield solve_board(board, options, False, timeout)
+        return
+
+    batch = []
+    for board in boards:
+        if len(batch) > 0 and (len(batch) == batch_size
+                or board.BoardSize != batch[0].BoardSize):
+            for record in solve_batch(batch, options, timeout):
+                yield record
+            batch = []
+        batch.append(board)
+    if len(batch) > 0:
+        for record in solve_batch(batch, options, timeout):
+            yield record
+
+def solve_batch(boards, options, timeout = None):
+    """Returns the result records of a list of boards of one size"""
+    size = boards[0].BoardSize
+    start_time = time.time()
+    cand = candidate_array(boards, size)
+    status = propagate(cand)
+    values = board_values(cand)
+    share = (time.time() - start_time) / len(boards)
+
+    records = []
+    for i in range(len(boards)):
+        board = SudokuBoard(size, bytearray(values[i].tostring()))
+        if status[i] == OPEN:
+            record = solve_board(board, options, False, timeout)
+            record['elapsed'] += share
+        else:
+            record = {'elapsed': share, 'nodes': 0}
+            if status[i] == SOLVED:
+                record['status'] = 'solved'
+                record['solution'] = board.CurrentGameBoard
+            else:
+                record['status'] = 'unsolved'
+                record['solution'] = None
+        records.append(record)
+    return records
+
+def load_inputs(patterns):
+    """Generates a (path, SudokuBoard) pair for every puzzle in the given
+    .pack files, directories or glob patterns of .sudoku files. A puzzle from
+    a pack is named pack:index."""
+    for pattern in patterns:
+        if pattern.endswith('.pack'):
+            with PuzzlePack(pattern) as pack:
+                for i in range(len(pack)):
+                    yield '%s:%d' % (pattern, i), pack[i]
+        else:
+            for path, board in load_puzzles([pattern]):
+                yield path, board
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Solve sudoku puzzles in NumPy batches.')
+    parser.add_argument('patterns', nargs = '+',
+        help = '.pack files, directories or glob patterns of .sudoku files')
+    for flag, name in SOLVE_FLAGS:
+        parser.add_argument(flag, dest = name, action = 'store_true')
+    parser.add_argument('-o', '--output', default = '-',
+        help = 'file receiving the JSON Lines records (default: stdout)')
+    parser.add_argument('--batch-size', type = int, default = 1024,
+        help = 'boards propagated together (default: 1024)')
+    parser.add_argument('--timeout', type = float, default = None,
+        help = 'seconds allowed per puzzle left to the search')
+    parser.add_argument('--node-limit', type = int, default = None,
+        help = 'search nodes allowed per puzzle left to the search')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    options = dict((name, getattr(args, name)) for flag, name in SOLVE_FLAGS)
+    if args.node_limit is not None:
+        options['node_limit'] = args.node_limit
+    paths = collections.deque()
+    def boards():
+        for path, board in load_inputs(args.patterns):
+            paths.append(path)
+            yield board
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        records = solve_boards(boards(), options, args.timeout, args.batch_size)
+        write_records((dict(record, path = paths.popleft()) for record in records), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()